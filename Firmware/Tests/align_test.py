@@ -1,8 +1,13 @@
+import os
+import sys
 import threading
 from time import sleep, time
 from target_detector import TargetDetector
 import pigpio
-import math
+
+# Appended rather than inserted, so this directory's target_detector.py is still the one imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stepper_waves import WaveStepper
 
 # Constants for navigation
 MM_TO_STEPS = 10  # Conversion factor from cm to steps
@@ -24,7 +29,8 @@ ECHO_PIN = 18  # Ultrasonic sensor echo pin
 
 def move_motor(direction, total_steps, max_speed=500, accel_steps=100):
     """
-    Moves the motor with an S-curve acceleration and deceleration profile.
+    Moves the motor with an S-curve acceleration and deceleration profile, played back by pigpio from a
+    wave chain.
 
     Args:
         direction (int): Direction to move (1 for forward, 0 for backward).
@@ -32,33 +38,7 @@ def move_motor(direction, total_steps, max_speed=500, accel_steps=100):
         max_speed (int): Maximum speed in steps per second.
         accel_steps (int): Steps over which to accelerate and decelerate.
     """
-    pi.write(DIR_PIN, direction)
-    
-    # Prepare S-curve acceleration parameters
-    accel_steps = min(accel_steps, total_steps // 2)
-    decel_start = total_steps - accel_steps
-    current_speed = 0
-
-    for step in range(total_steps):
-        phase_progress = step / accel_steps if step < accel_steps else (total_steps - step) / accel_steps
-
-        # Adjust acceleration based on an S-curve profile
-        accel_factor = (1 - math.cos(math.pi * phase_progress)) / 2  # Generates an S-curve shape factor
-
-        if step < accel_steps:  # Acceleration phase
-            current_speed = max_speed * accel_factor
-        elif step >= decel_start:  # Deceleration phase
-            current_speed = max_speed * accel_factor
-        else:
-            current_speed = max_speed  # Constant speed phase
-
-        delay = 1 / (2 * max(current_speed, 1))  # Ensure delay is never zero
-
-        # Move the motor one step
-        pi.write(STEP_PIN, 1)
-        sleep(delay)
-        pi.write(STEP_PIN, 0)
-        sleep(delay)
+    stepper.move(direction, total_steps, max_speed, accel_steps)
 
 def align():
     consecutive_aligned = 0  # Counter for how many times the target is consecutively aligned
@@ -114,6 +94,8 @@ pi.set_pull_up_down(SWITCH_PIN, pigpio.PUD_UP)
 pi.set_mode(TRIG_PIN, pigpio.OUTPUT)
 pi.set_mode(ECHO_PIN, pigpio.INPUT)
 
+stepper = WaveStepper(pi, STEP_PIN, DIR_PIN)
+
 # Start the target detector and main code threads
 detector_thread = threading.Thread(target=target_detector.detect_targets)
 detector_thread.start()
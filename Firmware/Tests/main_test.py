@@ -5,9 +5,15 @@ import time
 import pigpio
 from gpiozero import Button, DistanceSensor
 
+import os
 import queue
+import sys
 import threading
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from debug_view import DebugView
+from wave_cache import WaveCache
+
 # GPIO PINS
 STEP_PIN = 21
 DIR_PIN = 20
@@ -42,20 +48,31 @@ def detector(fps_limit=30, width=640, height=480, debug=False):
     # Set the frame rate limit
     cap.set(cv2.CAP_PROP_FPS, fps_limit)
 
+    # Blue color
+    low_blue = np.array([94, 80, 2])
+    high_blue = np.array([126, 255, 255])
+
+    # Preallocate every intermediate image once and reuse it for each frame
+    _, frame = cap.read()
+    hsv_frame = np.empty_like(frame)
+    blue_mask = np.empty(frame.shape[:2], np.uint8)
+    blue = np.empty_like(frame)
+    median = np.empty_like(frame)
+    gray = np.empty(frame.shape[:2], np.uint8)
+    view = DebugView(name="Frame") if debug else None
+
     while True:
-        _, frame = cap.read()
-        hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        _, frame = cap.read(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=hsv_frame)
 
-        # Blue color
-        low_blue = np.array([94, 80, 2])
-        high_blue = np.array([126, 255, 255])
-        blue_mask = cv2.inRange(hsv_frame, low_blue, high_blue)
-        blue = cv2.bitwise_and(frame, frame, mask=blue_mask)
+        cv2.inRange(hsv_frame, low_blue, high_blue, dst=blue_mask)
+        blue[:] = 0  # bitwise_and leaves pixels outside the mask untouched in dst
+        cv2.bitwise_and(frame, frame, dst=blue, mask=blue_mask)
 
-        median = cv2.medianBlur(blue, 15)
+        cv2.medianBlur(blue, 15, dst=median)
 
         # Find contours
-        gray = cv2.cvtColor(median, cv2.COLOR_BGR2GRAY)
+        cv2.cvtColor(median, cv2.COLOR_BGR2GRAY, dst=gray)
         contours, _ = cv2.findContours(gray, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
 
         if contours:
@@ -75,32 +92,22 @@ def detector(fps_limit=30, width=640, height=480, debug=False):
             displacement_x = cX - center_frame_x
             target_offset_queue.put(displacement_x)
 
-            if debug:
-                # Display the displacement on the frame
-                cv2.putText(frame, f"Displacement: {displacement_x}px", (50, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-                # Draw the largest contour and its center
-                cv2.drawContours(frame, [largest_contour], -1, (0, 255, 0), 3)
-                cv2.circle(frame, (cX, cY), 7, (255, 255, 255), -1)
-                cv2.putText(frame, "center", (cX - 20, cY - 20),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+            target = (cX, cY, cv2.boundingRect(largest_contour), M["m00"], None)
         else:
+            target = None
             # Clear the queue if no contours are found
             while not target_offset_queue.empty():
                 target_offset_queue.get()
 
-        if debug:
-            cv2.imshow("Blue", median)
-            cv2.imshow("Frame", frame)
-
-        key = cv2.waitKey(1)
-        if key == 27:  # Escape key
-            break
+        if view is not None:
+            # Overlays are drawn on the view's thread from a rate-limited copy of the frame
+            view.submit(frame, target, mask=median, contours=[largest_contour] if target else None)
+            if view.closed:  # Escape pressed in the window
+                break
 
     cap.release()
-    if debug:
-        cv2.destroyAllWindows()
+    if view is not None:
+        view.stop()
 
 def distance():
     return ultrasonic.distance * 10
@@ -119,32 +126,33 @@ def move_motor(start_frequency, final_frequency, steps, dir=1, run_time=None):
         print("Error connecting to pigpio daemon. Is the daemon running?")
         return
 
-    pi.wave_clear()  # clear existing waves
     pi.write(DIR_PIN, dir)
 
     # Calculate frequency increments
     frequency_step = (final_frequency - start_frequency) / steps
-    current_frequency = start_frequency
-
-    wid = []
-
-    for _ in range(steps):
-        micros = int(500000 / current_frequency)  # microseconds for half a step
-        wf = [
-            pigpio.pulse(1 << STEP_PIN, 0, micros),
-            pigpio.pulse(0, 1 << STEP_PIN, micros)
-        ]
-        pi.wave_add_generic(wf)
-        wave_id = pi.wave_create()
-        wid.append(wave_id)  # Append the new wave ID to the list
-        current_frequency += frequency_step  # increment or decrement frequency
-    
-    # Generate a chain of waves
-    chain = []
-    for wave_id in wid:
-        chain += [255, 0, wave_id, 255, 1, 1, 0]  # Transmit each wave once
 
-    pi.wave_chain(chain)  # Transmit chain
+    def ramp_pulses():
+        # Called only the first time this ramp is played, later moves reuse its cached wave
+        frequency = start_frequency
+        wf = []
+        for _ in range(steps):
+            micros = int(500000 / frequency)  # microseconds for half a step
+            wf.append(pigpio.pulse(1 << STEP_PIN, 0, micros))
+            wf.append(pigpio.pulse(0, 1 << STEP_PIN, micros))
+            frequency += frequency_step  # increment or decrement frequency
+        return wf
+
+    # The whole ramp is one wave, keyed by its profile so it is shared by both directions
+    ramp_id = wave_cache.get(("ramp", STEP_PIN, start_frequency, final_frequency, steps), ramp_pulses)
+    micros = int(500000 / (start_frequency + (steps - 1) * frequency_step))  # Last step of the ramp
+    last_id = wave_cache.get(("step", STEP_PIN, micros), lambda: [
+        pigpio.pulse(1 << STEP_PIN, 0, micros),
+        pigpio.pulse(0, 1 << STEP_PIN, micros)
+    ], keep=(ramp_id,))
+    wid = [ramp_id, last_id]
+
+    wave_cache.set_playing(wid)  # Keep the waves from being evicted while they play
+    pi.wave_chain([ramp_id])  # Transmit the ramp
 
     # Handle run time
     if run_time is not None:
@@ -155,42 +163,32 @@ def move_motor(start_frequency, final_frequency, steps, dir=1, run_time=None):
         # If no run_time specified, repeat the last waveform indefinitely
         pi.wave_send_repeat(wid[-1])
 
-    # Clean up waveforms
-    global last_wave_ids
-    last_wave_ids = wid  # Store wave IDs globally to allow stopping later
-
 def stop_motor():
-    """Stop any running waveforms and clean up."""
-    global last_wave_ids
+    """Stop any running waveforms, their waves stay cached for the next move."""
     pi.wave_tx_stop()  # Stop any waveform transmission
-    if last_wave_ids is not None:
-        for wave_id in last_wave_ids:
-            pi.wave_delete(wave_id)  # Clean up each waveform individually
-    last_wave_ids = None
 
 def align():
     consecutive_aligned = 0
     while consecutive_aligned < REQ_CONSEC:
-        if not target_offset_queue.empty():
-            offset = target_offset_queue.get()
-            # Calculate the step delay and direction based on offset
-            if offset == 0:
-                consecutive_aligned += 1  # Increment if aligned
-                continue
-            else:
-                consecutive_aligned = 0  # Reset if not aligned
+        offset = target_offset_queue.get()  # Blocks until the detector measures an offset
+        # Calculate the step delay and direction based on offset
+        if offset == 0:
+            consecutive_aligned += 1  # Increment if aligned
+            continue
+        else:
+            consecutive_aligned = 0  # Reset if not aligned
 
-            # Determine direction based on the sign of the offset
-            direction = 1 if offset > 0 else 0
-            pi.write(DIR_PIN, direction)
+        # Determine direction based on the sign of the offset
+        direction = 1 if offset > 0 else 0
+        pi.write(DIR_PIN, direction)
 
-            # Calculate number of steps (proportional to the offset)
-            steps = int(abs(offset) * X_OFFSET_CONV_FACTOR)
+        # Calculate number of steps (proportional to the offset)
+        steps = int(abs(offset) * X_OFFSET_CONV_FACTOR)
 
-            # Create a simple waveform for these steps
-            for _ in range(steps):
-                pi.gpio_trigger(STEP_PIN, 10, 1)  # Trigger pulse for step
-                time.sleep(0.001)  # Small delay between steps to control speed
+        # Create a simple waveform for these steps
+        for _ in range(steps):
+            pi.gpio_trigger(STEP_PIN, 10, 1)  # Trigger pulse for step
+            time.sleep(0.001)  # Small delay between steps to control speed
 
     # Stop the motor once aligned
     pi.write(STEP_PIN, 0)  # Ensuring no more steps are triggered
@@ -240,10 +238,8 @@ def cycle():
     # Time to clear the origin / first target
     time.sleep(10)  # Move forward for 10 seconds or until target is found
 
-    while True:
-        if not target_offset_queue.empty():
-            move_motor(start_frequency=1000, final_frequency=300, steps=100, dir=1, run_time=None)
-            break
+    target_offset_queue.get()  # Blocks until the detector sees the next target
+    move_motor(start_frequency=1000, final_frequency=300, steps=100, dir=1, run_time=None)
     
     # Align with the target
     align()
@@ -282,7 +278,7 @@ if not pi.connected:
     print("Error connecting to pigpio daemon. Is the daemon running?")
 
 pi.set_mode(STEP_PIN, pigpio.OUTPUT)
-pi.wave_clear()
+wave_cache = WaveCache(pi)  # Owns every wave, clearing any left on the daemon
 
 ultrasonic = DistanceSensor(echo=ECHO_PIN, trigger=TRIG_PIN)
 limit_switch = Button(SWITCH_PIN)
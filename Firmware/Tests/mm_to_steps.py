@@ -1,8 +1,10 @@
-import threading
-from time import sleep, time
-import math
+import os
+import sys
 import pigpio
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stepper_waves import WaveStepper
+
 # GPIO Pins configuration
 STEP_PIN = 21  # Stepper motor step pin
 DIR_PIN = 20  # Stepper motor direction pin
@@ -23,7 +25,8 @@ PHASE_1_STOP_TIME = 7.5  # Stop time in phase 1 in seconds
 
 def move_motor(direction, total_steps, max_speed=500, accel_steps=100):
     """
-    Moves the motor with constant acceleration and deceleration.
+    Moves the motor with constant acceleration and deceleration, played back by pigpio from a wave chain
+    so the calibration runs at the same speeds as the firmware.
 
     Args:
         direction (int): Direction to move (1 for forward, 0 for backward).
@@ -31,32 +34,7 @@ def move_motor(direction, total_steps, max_speed=500, accel_steps=100):
         max_speed (int): Maximum speed in steps per second.
         accel_steps (int): Steps over which to accelerate and decelerate.
     """
-    pi.write(DIR_PIN, direction)
-    
-    # Ensure acceleration/deceleration phases don't exceed half the total steps
-    accel_steps = min(accel_steps, total_steps // 2)
-    decel_start = total_steps - accel_steps
-    speed_increment = max_speed / accel_steps  # Calculate speed increment for each step
-    
-    current_speed = 0
-
-    for step in range(total_steps):
-        if step < accel_steps:  # Acceleration phase
-            current_speed += speed_increment
-        elif step >= decel_start:  # Deceleration phase
-            current_speed -= speed_increment
-
-        # Ensure speed does not exceed max_speed during acceleration or drop below 0 during deceleration
-        current_speed = max(1, min(current_speed, max_speed))
-        
-        # Calculate delay for current speed
-        delay = 1 / (2 * current_speed)
-        
-        # Move the motor one step at the current speed
-        pi.write(STEP_PIN, 1)
-        sleep(delay)
-        pi.write(STEP_PIN, 0)
-        sleep(delay)
+    stepper.move(direction, total_steps, max_speed, accel_steps, profile="trapezoid")
 
 def calibrate_cm_to_steps():
     """
@@ -89,4 +67,6 @@ pi.set_pull_up_down(SWITCH_PIN, pigpio.PUD_UP)
 pi.set_mode(TRIG_PIN, pigpio.OUTPUT)
 pi.set_mode(ECHO_PIN, pigpio.INPUT)
 
+stepper = WaveStepper(pi, STEP_PIN, DIR_PIN)
+
 calibrate_cm_to_steps()
@@ -1,12 +1,18 @@
+import os
+import sys
 import pigpio
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wave_cache import WaveCache
+
 # Define GPIO pins for the stepper motor
 STEP_PIN = 21
 DIR_PIN = 20
 pi = pigpio.pi()
 pi.set_mode(STEP_PIN, pigpio.OUTPUT)
 pi.set_mode(DIR_PIN, pigpio.OUTPUT)
+wave_cache = WaveCache(pi)  # Owns every wave, clearing any left on the daemon
 
 def move_motor(start_frequency, final_frequency, steps, dir=1, run_time=None):
     """Generate ramp waveforms from start to final frequency.
@@ -22,32 +28,33 @@ def move_motor(start_frequency, final_frequency, steps, dir=1, run_time=None):
         print("Error connecting to pigpio daemon. Is the daemon running?")
         return
 
-    pi.wave_clear()  # clear existing waves
     pi.write(DIR_PIN, dir)
 
     # Calculate frequency increments
     frequency_step = (final_frequency - start_frequency) / steps
-    current_frequency = start_frequency
 
-    wid = []
+    def ramp_pulses():
+        # Called only the first time this ramp is played, later moves reuse its cached wave
+        frequency = start_frequency
+        wf = []
+        for _ in range(steps):
+            micros = int(500000 / frequency)  # microseconds for half a step
+            wf.append(pigpio.pulse(1 << STEP_PIN, 0, micros))
+            wf.append(pigpio.pulse(0, 1 << STEP_PIN, micros))
+            frequency += frequency_step  # increment or decrement frequency
+        return wf
 
-    for _ in range(steps):
-        micros = int(500000 / current_frequency)  # microseconds for half a step
-        wf = [
-            pigpio.pulse(1 << STEP_PIN, 0, micros),
-            pigpio.pulse(0, 1 << STEP_PIN, micros)
-        ]
-        pi.wave_add_generic(wf)
-        wave_id = pi.wave_create()
-        wid.append(wave_id)  # Append the new wave ID to the list
-        current_frequency += frequency_step  # increment or decrement frequency
-    
-    # Generate a chain of waves
-    chain = []
-    for wave_id in wid:
-        chain += [255, 0, wave_id, 255, 1, 1, 0]  # Transmit each wave once
+    # The whole ramp is one wave, keyed by its profile so it is shared by both directions
+    ramp_id = wave_cache.get(("ramp", STEP_PIN, start_frequency, final_frequency, steps), ramp_pulses)
+    micros = int(500000 / (start_frequency + (steps - 1) * frequency_step))  # Last step of the ramp
+    last_id = wave_cache.get(("step", STEP_PIN, micros), lambda: [
+        pigpio.pulse(1 << STEP_PIN, 0, micros),
+        pigpio.pulse(0, 1 << STEP_PIN, micros)
+    ], keep=(ramp_id,))
+    wid = [ramp_id, last_id]
 
-    pi.wave_chain(chain)  # Transmit chain
+    wave_cache.set_playing(wid)  # Keep the waves from being evicted while they play
+    pi.wave_chain([ramp_id])  # Transmit the ramp
 
     # Handle run time
     if run_time is not None:
@@ -58,18 +65,9 @@ def move_motor(start_frequency, final_frequency, steps, dir=1, run_time=None):
         # If no run_time specified, repeat the last waveform indefinitely
         pi.wave_send_repeat(wid[-1])
 
-    # Clean up waveforms
-    global last_wave_ids
-    last_wave_ids = wid  # Store wave IDs globally to allow stopping later
-
 def stop_motor():
-    """Stop any running waveforms and clean up."""
-    global last_wave_ids
+    """Stop any running waveforms, their waves stay cached for the next move."""
     pi.wave_tx_stop()  # Stop any waveform transmission
-    if last_wave_ids is not None:
-        for wave_id in last_wave_ids:
-            pi.wave_delete(wave_id)  # Clean up each waveform individually
-    last_wave_ids = None
 
 # Example usage:
 if not pi.connected:
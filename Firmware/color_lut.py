@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+from frame_buffers import ScratchBuffers
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "color_lut.npz")
+
+class ColorLUT:
+    """
+    Lookup table mapping every 24-bit BGR colour to the colour classes it belongs to.
+
+    Each class owns one bit of the uint8 table value, so up to 8 labelled HSV ranges are classified in a
+    single lookup and ranges may overlap. A class mask is the classified image ANDed with the class bit,
+    which findContours accepts directly since it treats any non-zero pixel as foreground.
+    """
+
+    def __init__(self, color_ranges, cache_path=DEFAULT_CACHE_PATH):
+        """
+        Args:
+            color_ranges (dict): Class name -> (hsv_lower, hsv_upper), in OpenCV HSV units.
+            cache_path (str): File the table is persisted to, or None to always build in memory.
+        """
+        if not 0 < len(color_ranges) <= 8:
+            raise ValueError("ColorLUT supports between 1 and 8 colour classes")
+        self.color_ranges = {name: (tuple(int(v) for v in lower), tuple(int(v) for v in upper))
+                             for name, (lower, upper) in color_ranges.items()}
+        self.bits = {name: 1 << i for i, name in enumerate(self.color_ranges)}
+        self.cache_path = cache_path
+        self.key = hashlib.sha1(json.dumps(self.color_ranges, sort_keys=True).encode()).hexdigest()
+        self.scratch = ScratchBuffers()  # Reused BGRA buffer, the 4th byte pads each pixel to a uint32 index
+        self.table = self.load() if cache_path else None
+        if self.table is None:
+            self.table = self.build()
+            if cache_path:
+                self.save()
+
+    def build(self):
+        """
+        Classifies all 2^24 colours with cvtColor + inRange, one blue-channel slab at a time to bound memory.
+
+        Returns:
+            ndarray: uint8 table indexed by (r << 16) | (g << 8) | b.
+        """
+        table = np.zeros(1 << 24, np.uint8)
+        green, red = np.meshgrid(np.arange(256, dtype=np.uint8), np.arange(256, dtype=np.uint8))
+        slab = np.empty((256, 256, 3), np.uint8)
+        slab[..., 1] = green
+        slab[..., 2] = red
+        for blue in range(256):
+            slab[..., 0] = blue
+            hsv = cv2.cvtColor(slab, cv2.COLOR_BGR2HSV)
+            labels = np.zeros((256, 256), np.uint8)
+            for name, (lower, upper) in self.color_ranges.items():
+                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+                labels |= mask & self.bits[name]
+            # Row is red, column is green, so the slab flattens to (r << 8) | g for this blue value
+            table[blue::256] = labels.ravel()
+        return table
+
+    def load(self):
+        """
+        Returns:
+            ndarray: The cached table, or None if the cache is missing or was built from other ranges.
+        """
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with np.load(self.cache_path) as data:
+                if str(data["key"]) != self.key:
+                    return None
+                return data["table"]
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self):
+        # The table is mostly zeros, so it compresses to a few hundred kB
+        np.savez_compressed(self.cache_path, key=self.key, table=self.table)
+
+    def classify(self, image, dst=None):
+        """
+        Looks up the class bits of every pixel.
+
+        Args:
+            image (ndarray): BGR image or a view of part of one.
+            dst (ndarray): Optional uint8 output array with the image's height and width.
+
+        Returns:
+            ndarray: uint8 image of class bits.
+        """
+        height, width = image.shape[:2]
+        bgra = self.scratch.get("bgra", (height, width, 4))
+        cv2.cvtColor(image, cv2.COLOR_BGR2BGRA, dst=bgra)
+        # Little-endian uint32 view is (a << 24) | (r << 16) | (g << 8) | b, drop the alpha byte
+        index = bgra.view(np.uint32)[..., 0]
+        np.bitwise_and(index, 0xFFFFFF, out=index)
+        if dst is None:
+            dst = np.empty((height, width), np.uint8)
+        np.take(self.table, index, out=dst)
+        return dst
+
+    def mask(self, image, name, dst=None):
+        """
+        Args:
+            image (ndarray): BGR image.
+            name (str): Colour class.
+            dst (ndarray): Optional uint8 output array with the image's height and width.
+
+        Returns:
+            ndarray: uint8 mask, non-zero where the pixel belongs to the class.
+        """
+        labels = self.classify(image, dst)
+        if len(self.bits) > 1:
+            np.bitwise_and(labels, self.bits[name], out=labels)
+        return labels
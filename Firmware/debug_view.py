@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+OUTPUTS = ("window", "images", "mjpeg")
+
+class DebugView:
+    """
+    Renders detection overlays on its own thread, so debugging never slows the detection loop.
+
+    submit() is the only call made on the detector thread. It drops frames beyond max_fps without touching
+    them, copies the rest into pooled buffers and queues them. The queue holds at most queue_size frames and
+    drops the oldest when full, so a slow display or disk only lowers the debug frame rate.
+
+    Outputs:
+        "window": cv2.imshow() window. Escape closes it and sets closed.
+        "images": Numbered JPEG files in the directory given by path.
+        "mjpeg": One motion JPEG file at path, a concatenation of JPEG frames that ffmpeg, VLC and
+            frame_source.py can play.
+    """
+
+    def __init__(self, output="window", path=None, max_fps=10, queue_size=2, name="Target Detection",
+                 jpeg_quality=80):
+        """
+        Args:
+            output (str): One of OUTPUTS.
+            path (str): Directory for "images" or file for "mjpeg".
+            max_fps (float): Most frames rendered per second, None for no limit.
+            queue_size (int): Frames waiting to be rendered before the oldest is dropped.
+            name (str): Window title.
+            jpeg_quality (int): JPEG quality for the file outputs.
+        """
+        if output not in OUTPUTS:
+            raise ValueError(f"Unknown debug output {output!r}, expected one of {', '.join(OUTPUTS)}")
+        if output != "window" and not path:
+            raise ValueError(f"The {output} debug output needs a path")
+        self.output = output
+        self.path = path
+        self.interval = 1 / max_fps if max_fps else 0.0
+        self.name = name
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.condition = threading.Condition()
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.free = []  # Frame buffers returned by the renderer, reused by submit()
+        self.is_running = False
+        self.closed = False  # Set when the window is closed with Escape
+        self.thread = None
+        self.file = None
+        self.last_submit = 0.0
+        self.submitted = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.rendered = 0
+
+    def start(self):
+        """
+        Starts the render thread.
+        """
+        if self.is_running:
+            return
+        if self.output == "images":
+            os.makedirs(self.path, exist_ok=True)
+        elif self.output == "mjpeg":
+            self.file = open(self.path, "wb")
+        self.is_running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Renders the frames still queued, then stops the render thread and closes the output.
+        """
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def buffer(self, image):
+        # Called with the condition held
+        for index, buffer in enumerate(self.free):
+            if buffer.shape == image.shape and buffer.dtype == image.dtype:
+                return self.free.pop(index)
+        return np.empty_like(image)
+
+    def submit(self, frame, target=None, window=None, mask=None, contours=None, text=None):
+        """
+        Queues a copy of a frame for rendering, unless it comes sooner than max_fps allows. Starts the render
+        thread on first use.
+
+        Args:
+            frame (ndarray): BGR frame. Not kept, so the caller may reuse it straight away.
+            target (tuple): (center_x, center_y, bounding_rect, area, circularity) as returned by
+                TargetDetector.find_target(), or None.
+            window (tuple): Tracking window (x0, y0, x1, y1) searched for this frame.
+            mask (ndarray): Optional mask or intermediate image, shown as an inset in the top right corner.
+            contours (list): Optional contours to outline, in frame coordinates. Kept, not copied.
+            text (str): Optional caption.
+
+        Returns:
+            bool: Whether the frame was queued.
+        """
+        now = time.monotonic()
+        if now - self.last_submit < self.interval:
+            self.skipped += 1
+            return False
+        self.last_submit = now
+        if not self.is_running:
+            self.start()
+
+        with self.condition:
+            frame_copy = self.buffer(frame)
+            mask_copy = self.buffer(mask) if mask is not None else None
+        np.copyto(frame_copy, frame)
+        if mask is not None:
+            np.copyto(mask_copy, mask)
+
+        with self.condition:
+            if len(self.queue) >= self.queue_size:
+                old = self.queue.popleft()  # Drop the oldest, the newest frame is the useful one
+                self.recycle(old)
+                self.dropped += 1
+            self.queue.append((frame_copy, target, window, mask_copy, contours, text))
+            self.submitted += 1
+            self.condition.notify()
+        return True
+
+    def recycle(self, item):
+        # Called with the condition held
+        self.free.append(item[0])
+        if item[3] is not None:
+            self.free.append(item[3])
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or not self.is_running)
+                if not self.queue:
+                    break
+                item = self.queue.popleft()
+            image = self.draw(*item)
+            self.write(image)
+            with self.condition:
+                self.recycle(item)
+                self.rendered += 1
+        if self.output == "window" and self.rendered:
+            cv2.destroyWindow(self.name)  # HighGUI windows belong to the thread that created them
+
+    def draw(self, frame, target, window, mask, contours, text):
+        """
+        Draws the overlays onto the frame copy.
+
+        Returns:
+            ndarray: The annotated frame.
+        """
+        height, width = frame.shape[:2]
+        if mask is not None:
+            inset = mask if mask.ndim == 3 else cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+            inset = cv2.resize(inset, (width // 4, height // 4), interpolation=cv2.INTER_AREA)
+            frame[:height // 4, width - width // 4:] = inset
+        # Center line of the frame
+        cv2.line(frame, (width // 2, 0), (width // 2, height), (0, 0, 255), 2)
+        if window is not None:
+            cv2.rectangle(frame, window[:2], (window[2] - 1, window[3] - 1), (255, 0, 0), 1)
+        if contours:
+            cv2.drawContours(frame, contours, -1, (0, 255, 0), 3)
+        if target is not None:
+            center_x, center_y = int(target[0]), int(target[1])
+            cv2.circle(frame, (center_x, center_y), 5, (0, 255, 0), -1)
+            x, y, w, h = target[2]
+            cv2.rectangle(frame, (x, y), (x + w - 1, y + h - 1), (0, 255, 255), 1)
+            if text is None:
+                text = f"Displacement: {int(round(target[0] - width // 2))}px"
+        if text:
+            cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        return frame
+
+    def write(self, image):
+        if self.output == "window":
+            cv2.imshow(self.name, image)
+            if cv2.waitKey(1) == 27:  # Escape
+                self.closed = True
+        elif self.output == "images":
+            cv2.imwrite(os.path.join(self.path, f"frame_{self.rendered:06d}.jpg"), image, self.encode_params)
+        else:
+            ok, encoded = cv2.imencode(".jpg", image, self.encode_params)
+            if ok:
+                self.file.write(encoded.tobytes())
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Frames submitted, skipped by the rate limit, dropped from a full queue, and rendered.
+        """
+        with self.condition:
+            return {"submitted": self.submitted, "skipped": self.skipped, "dropped": self.dropped,
+                    "rendered": self.rendered}
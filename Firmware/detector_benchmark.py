@@ -0,0 +1,539 @@
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from color_lut import ColorLUT
+from detector_engines import ENGINES, contour_measurements
+from frame_buffers import FrameRing
+from frame_source import SAMPLE_DIR, open_source
+from parallel_detector import ParallelDetector
+from scene_generator import SceneGenerator
+from target_detector import TargetDetector
+
+SAMPLE_IMAGES = ["target_area.png", "target_area_w_bg.png"]
+
+# Colour classes for the lookup table benchmark: the firmware blue range plus the ranges used elsewhere in the repo
+LUT_CLASSES = {
+    "blue": ((110, 50, 50), (130, 255, 255)),
+    "blue_wide": ((94, 80, 2), (126, 255, 255)),
+    "red": ((0, 100, 100), (10, 255, 255)),
+}
+
+def load_sample_frames(width=640, height=480):
+    """
+    Places the sample target images into frames of the camera resolution at a few sizes and positions.
+
+    Returns:
+        list: BGR frames.
+    """
+    frames = []
+    for name in SAMPLE_IMAGES:
+        image = cv2.imread(os.path.join(SAMPLE_DIR, name))
+        if image is None:
+            raise IOError(f"Cannot read {name}")
+        for size in (120, 200, 300):
+            target = cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+            for x in (10, (width - size) // 2, width - size - 10):
+                frame = np.full((height, width, 3), 200, np.uint8)  # Light grey background
+                y = (height - size) // 2
+                frame[y:y + size, x:x + size] = target
+                frames.append(frame)
+    return frames
+
+def add_speckle(frames, specks=300, seed=0):
+    """
+    Scatters small blue specks and noise over copies of the frames, like sensor noise and clutter.
+
+    Returns:
+        list: Noisy BGR frames.
+    """
+    rng = np.random.default_rng(seed)
+    noisy = []
+    for frame in frames:
+        frame = frame.copy()
+        height, width = frame.shape[:2]
+        for x, y, radius in zip(rng.integers(0, width, specks), rng.integers(0, height, specks),
+                                rng.integers(1, 4, specks)):
+            cv2.circle(frame, (int(x), int(y)), int(radius), (255, 0, 0), -1)
+        noise = rng.normal(0, 8, frame.shape)
+        noisy.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return noisy
+
+def time_detector(detector, frames, repeat):
+    """
+    Runs a detector over the frames.
+
+    Returns:
+        tuple: (mean seconds per frame, list of centroids from the last pass).
+    """
+    centroids = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        centroids = [detector.process_frame(frame) for frame in frames]
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(frames)), centroids
+
+def centroid_error(reference, centroids):
+    """
+    Returns:
+        tuple: (mean error in pixels, max error in pixels, frames where only one of the two found a target).
+    """
+    errors = []
+    mismatched = 0
+    for ref, cen in zip(reference, centroids):
+        if ref is None or cen is None:
+            mismatched += ref is not cen
+            continue
+        errors.append(np.hypot(ref[0] - cen[0], ref[1] - cen[1]))
+    if not errors:
+        return 0.0, 0.0, mismatched
+    return float(np.mean(errors)), float(np.max(errors)), mismatched
+
+def benchmark_pyramid(frames, scales, repeat):
+    """
+    Compares coarse-to-fine detection against the full-frame path.
+    """
+    baseline = TargetDetector(camera_index=None)
+    base_time, reference = time_detector(baseline, frames, repeat)
+    print(f"{'mode':<16}{'ms/frame':>10}{'speedup':>10}{'mean err':>10}{'max err':>10}{'missed':>8}")
+    print(f"{'full-frame':<16}{base_time * 1e3:>10.3f}{1.0:>10.2f}{0.0:>10.3f}{0.0:>10.3f}{0:>8}")
+
+    for scale in scales:
+        detector = TargetDetector(camera_index=None, pyramid_scale=scale)
+        mode_time, centroids = time_detector(detector, frames, repeat)
+        mean_err, max_err, missed = centroid_error(reference, centroids)
+        print(f"{'pyramid 1/' + str(scale):<16}{mode_time * 1e3:>10.3f}{base_time / mode_time:>10.2f}"
+              f"{mean_err:>10.3f}{max_err:>10.3f}{missed:>8}")
+
+def time_call(function, frames, repeat):
+    """
+    Returns:
+        float: Mean seconds per frame of function(frame).
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            function(frame)
+    return (time.perf_counter() - start) / (repeat * len(frames))
+
+def benchmark_lut(frames, repeat):
+    """
+    Compares lookup table segmentation against cvtColor + inRange, for one class and for all LUT_CLASSES.
+    """
+    start = time.perf_counter()
+    lut = ColorLUT(LUT_CLASSES, cache_path=None)
+    print(f"lookup table built in {time.perf_counter() - start:.2f} s")
+
+    bounds = [(np.array(lower), np.array(upper)) for lower, upper in LUT_CLASSES.values()]
+
+    def hsv_one(frame):
+        return cv2.inRange(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV), *bounds[0])
+
+    def hsv_all(frame):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        return [cv2.inRange(hsv, lower, upper) for lower, upper in bounds]
+
+    single = ColorLUT({"blue": LUT_CLASSES["blue"]}, cache_path=None)
+    mismatched = sum(np.count_nonzero((single.mask(f, "blue") > 0) != (hsv_one(f) > 0)) for f in frames)
+
+    print(f"{'segmentation':<24}{'ms/frame':>10}")
+    print(f"{'cvtColor+inRange x1':<24}{time_call(hsv_one, frames, repeat) * 1e3:>10.3f}")
+    print(f"{'lookup table x1':<24}{time_call(lambda f: single.mask(f, 'blue'), frames, repeat) * 1e3:>10.3f}")
+    print(f"{'cvtColor+inRange x' + str(len(bounds)):<24}{time_call(hsv_all, frames, repeat) * 1e3:>10.3f}")
+    print(f"{'lookup table x' + str(len(bounds)):<24}{time_call(lut.classify, frames, repeat) * 1e3:>10.3f}")
+    print(f"pixels differing from inRange: {mismatched}")
+
+    baseline = TargetDetector(camera_index=None)
+    detector = TargetDetector(camera_index=None, color_lut=single)
+    print(f"{'detector':<24}{'ms/frame':>10}")
+    print(f"{'cvtColor+inRange':<24}{time_detector(baseline, frames, repeat)[0] * 1e3:>10.3f}")
+    print(f"{'lookup table':<24}{time_detector(detector, frames, repeat)[0] * 1e3:>10.3f}")
+
+def allocating_pipeline(frame):
+    """
+    The capture/segment path as it was before buffer reuse: every stage returns a new array.
+    """
+    frame = frame.copy()  # Stands in for cap.read() allocating a new frame
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, np.array([110, 50, 50]), np.array([130, 255, 255]))
+    return cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+
+def measure_allocations(function, frames, repeat):
+    """
+    Measures the memory each call allocates with tracemalloc, which sees NumPy and OpenCV output arrays.
+
+    Returns:
+        tuple: (mean bytes allocated per frame, bytes still held after the run, seconds per frame untraced).
+    """
+    for frame in frames:
+        function(frame)  # Warm up so buffers are already sized
+    seconds = time_call(function, frames, repeat)
+
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    allocated = 0
+    for _ in range(repeat):
+        for frame in frames:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            function(frame)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+    retained = tracemalloc.get_traced_memory()[0] - start_current
+    tracemalloc.stop()
+    return allocated / (repeat * len(frames)), retained, seconds
+
+def benchmark_memory(frames, repeat):
+    """
+    Compares the allocation rate of the allocating pipeline with TargetDetector reading into a frame ring.
+    """
+    detector = TargetDetector(camera_index=None)
+    ring = FrameRing()
+
+    def reused_pipeline(frame):
+        buffer = ring.next(frame.shape)
+        np.copyto(buffer, frame)  # Stands in for cap.read(buffer)
+        return detector.process_frame(buffer)
+
+    print(f"{'pipeline':<20}{'kB/frame':>10}{'MB/s':>10}{'retained kB':>14}{'ms/frame':>10}")
+    for name, function in (("allocating", allocating_pipeline), ("preallocated", reused_pipeline)):
+        per_frame, retained, seconds = measure_allocations(function, frames, repeat)
+        print(f"{name:<20}{per_frame / 1e3:>10.1f}{per_frame / seconds / 1e6:>10.1f}"
+              f"{retained / 1e3:>14.1f}{seconds * 1e3:>10.3f}")
+    print(f"scratch buffers held: {detector.scratch.nbytes() / 1e3:.1f} kB")
+
+def benchmark_engines(frames, args):
+    """
+    Compares every registered engine on the sample frames, clean and with two levels of speckle, against the
+    contour engine's centroids, then on synthetic scenes against the ground truth, segmenting with
+    cvtColor + inRange and with a two-class colour lookup table, whose masks hold class bits rather than 255.
+    """
+    print(f"{'engine':<28}{'ms/frame':>10}{'speedup':>10}{'mean err':>10}{'max err':>10}{'missed':>8}")
+    for label, specks in (("clean", 0), ("noisy", 300), ("cluttered", 3000)):
+        frame_set = add_speckle(frames, specks) if specks else frames
+        base_time, reference = time_detector(TargetDetector(camera_index=None), frame_set, args.repeat)
+        for engine in ENGINES:
+            detector = TargetDetector(camera_index=None, engine=engine)
+            mode_time, centroids = time_detector(detector, frame_set, args.repeat)
+            mean_err, max_err, missed = centroid_error(reference, centroids)
+            print(f"{engine + ' (' + label + ')':<28}{mode_time * 1e3:>10.3f}{base_time / mode_time:>10.2f}"
+                  f"{mean_err:>10.3f}{max_err:>10.3f}{missed:>8}")
+
+    # Ground truth comparison on generated scenes at the sample frame size
+    generator = SceneGenerator(args.width, args.height, seed=args.seed, target_probability=0.9)
+    scenes, truths = generator.generate_set(args.scenes)
+    print(f"\n{args.scenes} synthetic scenes at {args.width}x{args.height}")
+    print(f"{'engine':<28}{'ms/frame':>10}{'detected':>10}{'false +':>9}{'mean err':>10}{'p95 err':>10}")
+    lut = ColorLUT({"red": LUT_CLASSES["red"], "blue": LUT_CLASSES["blue"]}, cache_path=None)  # Blue is bit 2
+    for engine, color_lut in [(engine, None) for engine in ENGINES] + [(engine, lut) for engine in ENGINES]:
+        detector = TargetDetector(camera_index=None, engine=engine, color_lut=color_lut)
+        seconds, centroids = time_detector(detector, scenes, max(1, args.repeat // 10))
+        score = score_against_truth(truths, centroids)
+        label = engine + (" (lookup table)" if color_lut else "")
+        print(f"{label:<28}{seconds * 1e3:>10.3f}{score['detected']:>10.1%}{score['false_positives']:>9}"
+              f"{score['mean_error']:>10.3f}{score['p95_error']:>10.3f}")
+
+def loop_filter(contours, min_area, min_circularity):
+    """
+    The contour filter as it was before vectorising: contourArea and arcLength per contour, then contourArea
+    again to rank the survivors.
+    """
+    valid_contours = []
+    for cnt in contours:
+        area = cv2.contourArea(cnt)
+        perimeter = cv2.arcLength(cnt, True)
+        if perimeter == 0:
+            continue
+        circularity = 4 * np.pi * (area / (perimeter * perimeter))
+        if area > min_area and circularity > min_circularity:
+            valid_contours.append(cnt)
+    return max(valid_contours, key=cv2.contourArea) if valid_contours else None
+
+def benchmark_filtering(args):
+    """
+    Times contour retrieval and filtering on the mask of one cluttered synthetic scene: tree retrieval with the
+    per-contour loop as before, hierarchy-free retrieval with the same loop, and the contour engine's
+    hierarchy-free retrieval with the vectorised filter.
+    """
+    width, height = (int(v) for v in args.filter_resolution.split("x"))
+    generator = SceneGenerator(width, height, seed=args.seed, speck_range=(args.specks, args.specks),
+                               clutter_range=(30, 30), noise_range=(8, 8), target_probability=1.0)
+    frame, truth = generator.generate()
+    detector = TargetDetector(camera_index=None)
+    mask = detector.segment(frame).copy()
+
+    def loop_variant(mode):
+        def run():
+            contours, _ = cv2.findContours(mask, mode, cv2.CHAIN_APPROX_SIMPLE)
+            contour = loop_filter(contours, detector.min_area, detector.min_circularity)
+            if contour is None:
+                return None
+            moments = cv2.moments(contour)
+            return moments["m10"] / moments["m00"], moments["m01"] / moments["m00"]
+        return run
+
+    variants = {
+        "tree + loop": loop_variant(cv2.RETR_TREE),
+        "list + loop": loop_variant(cv2.RETR_LIST),
+        "external + loop": loop_variant(cv2.RETR_EXTERNAL),
+        "list + vectorised": lambda: detector.find_target_mask(mask),
+    }
+    contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    print(f"{width}x{height}, {args.specks} specks, {len(contours)} contours")
+    filter_times = {"loop": time_call(lambda _: loop_filter(contours, detector.min_area, detector.min_circularity),
+                                      [None], args.repeat),
+                    "vectorised": time_call(lambda _: contour_measurements(contours), [None], args.repeat)}
+    print(f"filter stage only: loop {filter_times['loop'] * 1e3:.3f} ms, "
+          f"vectorised measurements {filter_times['vectorised'] * 1e3:.3f} ms")
+
+    print(f"{'variant':<24}{'ms/frame':>10}{'speedup':>10}{'error px':>10}")
+    base = None
+    for name, run in variants.items():
+        seconds = time_call(lambda _: run(), [None], args.repeat)
+        base = base or seconds
+        target = run()
+        error = float("nan") if target is None else np.hypot(target[0] - truth[0], target[1] - truth[1])
+        print(f"{name:<24}{seconds * 1e3:>10.3f}{base / seconds:>10.2f}{error:>10.3f}")
+
+def benchmark_replay(args):
+    """
+    Runs one detector configuration over a recorded frame source as fast as possible.
+    """
+    source = open_source(args.source, loop=True)
+    source_frames = source.frame_count()
+    if source_frames <= 0:
+        raise IOError("Cannot determine the number of frames in the source")
+    lut = ColorLUT({"blue": ((110, 50, 50), (130, 255, 255))}) if args.lut else None
+    detector = TargetDetector(source=source, engine=args.engine, pyramid_scale=args.pyramid, tracking=args.tracking,
+                              color_lut=lut, instrument=True)
+
+    total = source_frames * args.repeat
+    latencies = np.empty(total)
+    results = []
+    start = time.perf_counter()
+    for i in range(total):
+        result = detector.detect_targets()
+        latencies[i] = result.latency
+        if i < source_frames:
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    print(f"source: {args.source or SAMPLE_DIR} ({source_frames} frames x {args.repeat} passes)")
+    print(f"engine: {args.engine}, pyramid 1/{args.pyramid}, tracking {'on' if args.tracking else 'off'}, "
+          f"lut {'on' if args.lut else 'off'}")
+    print(f"{total / elapsed:.1f} frames/s")
+    print(f"latency ms: p50 {np.percentile(latencies, 50) * 1e3:.3f}  p95 {np.percentile(latencies, 95) * 1e3:.3f}  "
+          f"p99 {np.percentile(latencies, 99) * 1e3:.3f}  max {latencies.max() * 1e3:.3f}")
+    detected = sum(result.centroid is not None for result in results)
+    print(f"target found in {detected}/{source_frames} source frames")
+    if args.centroids:
+        for result in results:
+            centroid = "none" if result.centroid is None else f"({result.centroid[0]:.2f}, {result.centroid[1]:.2f})"
+            print(f"  frame {result.frame_id}: centroid {centroid}, x displacement {result.x_displacement}")
+    detector.dump_stats()
+    detector.release()
+
+# Detector configurations compared by the synthetic benchmark
+SYNTHETIC_CONFIGS = {
+    "contours": {},
+    "components": {"engine": "components"},
+    "hough": {"engine": "hough"},
+    "pyramid 1/4": {"pyramid_scale": 4},
+    "pyramid 1/8": {"pyramid_scale": 8},
+}
+
+def score_against_truth(truths, centroids):
+    """
+    Returns:
+        dict: Detection rate, false positives, centroid error statistics and the median signed x and y offset of
+        the centroids against the ground truth.
+    """
+    offsets = np.array([(c[0] - t[0], c[1] - t[1]) for t, c in zip(truths, centroids) if t and c]).reshape(-1, 2)
+    errors = np.hypot(offsets[:, 0], offsets[:, 1])
+    with_target = sum(t is not None for t in truths)
+    return {
+        "detected": len(errors) / with_target if with_target else 0.0,
+        "false_positives": sum(t is None and c is not None for t, c in zip(truths, centroids)),
+        "mean_error": float(np.mean(errors)) if len(errors) else float("nan"),
+        "p95_error": float(np.percentile(errors, 95)) if len(errors) else float("nan"),
+        "bias_x": float(np.median(offsets[:, 0])) if len(errors) else float("nan"),
+        "bias_y": float(np.median(offsets[:, 1])) if len(errors) else float("nan"),
+    }
+
+def benchmark_synthetic(args):
+    """
+    Scores each detector configuration for speed and accuracy on generated scenes at several resolutions.
+    """
+    rows = []
+    print(f"{'resolution':<12}{'config':<14}{'fps':>9}{'detected':>10}{'false +':>9}{'mean err':>10}{'p95 err':>10}")
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.split("x"))
+        generator = SceneGenerator(width, height, seed=args.seed, target_probability=0.9)
+        frames, truths = generator.generate_set(args.scenes)
+        for name, config in SYNTHETIC_CONFIGS.items():
+            detector = TargetDetector(camera_index=None, **config)
+            seconds, centroids = time_detector(detector, frames, max(1, args.repeat // 10))
+            score = score_against_truth(truths, centroids)
+            rows.append({"resolution": resolution, "config": name, "fps": 1 / seconds, **score})
+            print(f"{resolution:<12}{name:<14}{1 / seconds:>9.1f}{score['detected']:>10.1%}"
+                  f"{score['false_positives']:>9}{score['mean_error']:>10.3f}{score['p95_error']:>10.3f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"results written to {args.csv}")
+
+def benchmark_motion(args):
+    """
+    Compares the static contour engine with the motion engine on scenes blurred by increasing travel during
+    the exposure, with the detector told the matching image velocity.
+    """
+    print(f"{'blur px':<9}{'engine':<12}{'ms/frame':>10}{'detected':>10}{'false +':>9}{'mean err':>10}{'p95 err':>10}"
+          f"{'bias x':>9}{'bias y':>9}")
+    for blur in args.blurs:
+        generator = SceneGenerator(args.width, args.height, seed=args.seed, blur_range=(blur, blur),
+                                   radius_range=(0.06, 0.15), target_probability=0.9)
+        frames, truths = generator.generate_set(args.scenes)
+        for engine in ("contours", "motion"):
+            detector = TargetDetector(camera_index=None, engine=engine)
+            detector.set_image_velocity(blur / detector.exposure_time)
+            seconds, centroids = time_detector(detector, frames, max(1, args.repeat // 10))
+            score = score_against_truth(truths, centroids)
+            print(f"{blur:<9}{engine:<12}{seconds * 1e3:>10.3f}{score['detected']:>10.1%}"
+                  f"{score['false_positives']:>9}{score['mean_error']:>10.3f}{score['p95_error']:>10.3f}"
+                  f"{score['bias_x']:>+9.3f}{score['bias_y']:>+9.3f}")
+
+def benchmark_debug(frames, args):
+    """
+    Compares the detector's frame time with debugging off and with the debug view writing each file output.
+    """
+    outputs = {"off": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        outputs["images"] = {"debug_mode": True, "debug_output": "images",
+                             "debug_path": os.path.join(directory, "images")}
+        outputs["mjpeg"] = {"debug_mode": True, "debug_output": "mjpeg",
+                            "debug_path": os.path.join(directory, "debug.mjpeg")}
+        print(f"{'debug':<10}{'ms/frame':>10}{'rendered':>10}{'skipped':>10}{'dropped':>10}")
+        for name, config in outputs.items():
+            detector = TargetDetector(camera_index=None, debug_fps=args.debug_fps, **config)
+            seconds, _ = time_detector(detector, frames, args.repeat)
+            view = detector.debug_view
+            if view is not None:
+                view.stop()
+                stats = view.get_stats()
+            else:
+                stats = {"rendered": 0, "skipped": 0, "dropped": 0}
+            print(f"{name:<10}{seconds * 1e3:>10.3f}{stats['rendered']:>10}{stats['skipped']:>10}"
+                  f"{stats['dropped']:>10}")
+
+def run_parallel(pool, frames, repeat):
+    """
+    Pushes every frame through a ParallelDetector.
+
+    Returns:
+        tuple: (frames per second, centroids of the last pass in frame order).
+    """
+    for frame in frames[:pool.slots]:
+        pool.submit(frame)  # Warm up the workers before timing
+    while pool.in_flight():
+        pool.collect(block=True)
+
+    results = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            pool.submit(frame)
+            results.extend(pool.collect())
+    while pool.in_flight():
+        results.extend(pool.collect(block=True))
+    elapsed = time.perf_counter() - start
+    return repeat * len(frames) / elapsed, [centroid for _, centroid in results[-len(frames):]]
+
+def benchmark_parallel(args):
+    """
+    Measures throughput of the multiprocess detector for 1 to --max-workers workers in both modes.
+    """
+    width, height = (int(v) for v in args.parallel_resolution.split("x"))
+    frames, _ = SceneGenerator(width, height, seed=args.seed).generate_set(args.scenes)
+    repeat = max(1, args.repeat // 10)
+
+    seconds, reference = time_detector(TargetDetector(camera_index=None), frames, repeat)
+    serial_fps = 1 / seconds
+    print(f"{args.parallel_resolution}, {os.cpu_count()} CPUs")
+    print(f"{'mode':<10}{'workers':>8}{'fps':>9}{'scaling':>9}{'mismatch':>10}")
+    print(f"{'serial':<10}{0:>8}{serial_fps:>9.1f}{1.0:>9.2f}{0:>10}")
+    for mode in ParallelDetector.MODES:
+        for workers in range(1, args.max_workers + 1):
+            pool = ParallelDetector(frames[0].shape, workers, mode)
+            try:
+                fps, centroids = run_parallel(pool, frames, repeat)
+            finally:
+                pool.close()
+            _, _, mismatched = centroid_error(reference, centroids)
+            print(f"{mode:<10}{workers:>8}{fps:>9.1f}{fps / serial_fps:>9.2f}{mismatched:>10}")
+
+BENCHMARKS = {
+    "pyramid": lambda frames, args: benchmark_pyramid(frames, args.scales, args.repeat),
+    "lut": lambda frames, args: benchmark_lut(frames, args.repeat),
+    "memory": lambda frames, args: benchmark_memory(frames, args.repeat),
+    "engines": lambda frames, args: benchmark_engines(frames, args),
+    "filtering": lambda frames, args: benchmark_filtering(args),
+    "replay": lambda frames, args: benchmark_replay(args),
+    "synthetic": lambda frames, args: benchmark_synthetic(args),
+    "motion": lambda frames, args: benchmark_motion(args),
+    "debug": lambda frames, args: benchmark_debug(frames, args),
+    "parallel": lambda frames, args: benchmark_parallel(args),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TargetDetector modes on the sample target images "
+                                                 "or a recorded frame source.")
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the frame set")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--scales", type=int, nargs="+", default=[4, 8], help="Pyramid downscale factors")
+    replay = parser.add_argument_group("replay", "Options for the replay benchmark")
+    replay.add_argument("--source", help="Video file, image file or image directory (default: sample images)")
+    replay.add_argument("--engine", choices=list(ENGINES), default="contours")
+    replay.add_argument("--pyramid", type=int, default=1, help="Pyramid downscale factor, 1 for full resolution")
+    replay.add_argument("--tracking", action="store_true", help="Enable the tracking window")
+    replay.add_argument("--lut", action="store_true", help="Segment with the colour lookup table")
+    replay.add_argument("--centroids", action="store_true", help="Print the centroid found in each source frame")
+    synthetic = parser.add_argument_group("synthetic", "Options for the synthetic scene benchmark")
+    synthetic.add_argument("--resolutions", nargs="+", default=["320x240", "640x480", "1280x720"],
+                           help="Frame sizes as WIDTHxHEIGHT")
+    synthetic.add_argument("--scenes", type=int, default=50, help="Generated scenes per resolution")
+    synthetic.add_argument("--seed", type=int, default=0)
+    synthetic.add_argument("--csv", help="Also write the results to this CSV file for charting")
+    filtering = parser.add_argument_group("filtering", "Options for the contour filtering benchmark")
+    filtering.add_argument("--filter-resolution", default="1280x720", help="Frame size as WIDTHxHEIGHT")
+    filtering.add_argument("--specks", type=int, default=2000, help="Blue specks scattered over the scene")
+    motion = parser.add_argument_group("motion", "Options for the motion blur benchmark, also uses --scenes")
+    motion.add_argument("--blurs", type=int, nargs="+", default=[0, 20, 40, 80], help="Blur lengths in pixels")
+    debug = parser.add_argument_group("debug", "Options for the debug view benchmark")
+    debug.add_argument("--debug-fps", type=float, default=10, help="Debug view rate limit, 0 for none")
+    parallel = parser.add_argument_group("parallel", "Options for the multiprocess benchmark")
+    parallel.add_argument("--max-workers", type=int, default=4)
+    parallel.add_argument("--parallel-resolution", default="640x480", help="Frame size as WIDTHxHEIGHT")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    frames = load_sample_frames(args.width, args.height)
+    print(f"{len(frames)} frames at {args.width}x{args.height}, {args.repeat} passes")
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name](frames, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import cv2
+import numpy as np
+
+# Engine name -> class, filled in by register_engine
+ENGINES = {}
+
+def register_engine(engine_class):
+    """
+    Class decorator that makes an engine available to TargetDetector(engine=name).
+    """
+    ENGINES[engine_class.name] = engine_class
+    return engine_class
+
+def create_engine(name, detector):
+    """
+    Args:
+        name (str): Registered engine name.
+        detector (TargetDetector): Detector the engine reads its thresholds, timer and scratch buffers from.
+
+    Returns:
+        DetectorEngine: A new engine instance.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown detector engine {name!r}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[name](detector)
+
+def contour_measurements(contours):
+    """
+    Computes the area and closed perimeter of every contour at once, instead of calling cv2.contourArea and
+    cv2.arcLength once per contour from Python.
+
+    The points of all contours are concatenated, each point is paired with the next point of its own contour
+    (the last wrapping to the first), and per-contour sums of the shoelace terms and segment lengths are taken
+    with np.add.reduceat. The results match cv2.contourArea and cv2.arcLength(closed=True).
+
+    Args:
+        contours (sequence): Contours from cv2.findContours.
+
+    Returns:
+        tuple: (areas, perimeters) float64 arrays, one entry per contour.
+    """
+    if len(contours) == 0:
+        return np.empty(0), np.empty(0)
+    lengths = np.fromiter(map(len, contours), np.intp, len(contours))
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+    starts = np.zeros(len(contours), np.intp)
+    np.cumsum(lengths[:-1], out=starts[1:])
+
+    following = np.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts  # Close each contour
+    x, y = points[:, 0], points[:, 1]
+    next_x, next_y = x[following], y[following]
+
+    areas = np.abs(np.add.reduceat(x * next_y - next_x * y, starts)) / 2
+    perimeters = np.add.reduceat(np.hypot(next_x - x, next_y - y), starts)
+    return areas, perimeters
+
+class DetectorEngine:
+    """
+    Finds the target in a segmented mask. TargetDetector does the capture, colour segmentation, tracking
+    window and pyramid search, and hands each mask (or part of one) to its engine.
+
+    Engines read min_area, min_circularity, timer and scratch from the detector when they run, so changing
+    a threshold on the detector takes effect straight away. An engine should lap the timer's "contours"
+    stage after extracting blobs and "filter" after choosing one.
+    """
+
+    name = None
+
+    def __init__(self, detector):
+        self.detector = detector
+
+    def find_target(self, mask, offset=(0, 0)):
+        """
+        Args:
+            mask (ndarray): uint8 mask of target-coloured pixels.
+            offset (tuple): (x, y) position of the mask within the full frame.
+
+        Returns:
+            tuple: (center_x, center_y, (x, y, w, h), area, circularity) in full-frame pixels, or None if no
+            valid target is found. circularity may be None if the engine does not measure it.
+        """
+        raise NotImplementedError
+
+    def lap(self, stage):
+        if self.detector.timer is not None:
+            self.detector.timer.lap(stage)
+
+@register_engine
+class ContourEngine(DetectorEngine):
+    """
+    Traces the contours of the mask and filters on area and circularity.
+    """
+
+    name = "contours"
+
+    def find_target(self, mask, offset=(0, 0)):
+        detector = self.detector
+
+        # The hierarchy is never used, so skip building it. RETR_LIST is as fast as RETR_EXTERNAL but keeps
+        # hole contours, so the inner edge of the blue ring still counts when clutter touches its outer edge.
+        contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        self.lap("contours")
+
+        # Area, perimeter and circularity of every contour in bulk
+        areas, perimeters = contour_measurements(contours)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            circularities = 4 * np.pi * areas / (perimeters * perimeters)
+        valid = (areas > detector.min_area) & (perimeters > 0) & (circularities > detector.min_circularity)
+        if not valid.any():
+            self.lap("filter")
+            return None
+
+        # Find the largest valid contour, assumed to be the target, reusing the computed areas
+        index = np.flatnonzero(valid)[np.argmax(areas[valid])]
+        area, circularity, largest_contour = float(areas[index]), float(circularities[index]), contours[index]
+        self.lap("filter")
+        moments = cv2.moments(largest_contour)
+        if moments["m00"] == 0:
+            return None
+
+        center_x = moments["m10"] / moments["m00"] + offset[0]
+        center_y = moments["m01"] / moments["m00"] + offset[1]
+        x, y, w, h = cv2.boundingRect(largest_contour)
+        self.lap("moments")
+        return center_x, center_y, (x + offset[0], y + offset[1], w, h), area, circularity
+
+@register_engine
+class MotionEngine(DetectorEngine):
+    """
+    Contour engine for detection on the move, where the target smears along the travel (x) axis.
+
+    While the detector's image_velocity is set, the blur length is the image speed times the exposure time.
+    A blob is then accepted if it matches the streak that blur predicts for a disc of its height: elongated
+    along x by about as much as the blur allows, neither more nor less, and about as long and as large as
+    the disc smeared over the blur length. It must also be round once the elongation is undone: its contour
+    is compressed along x until its second moments are equal, and the compressed contour must pass the usual
+    circularity test. Blobs outside any tolerance are rejected, so clutter streaks give no result rather
+    than a wrong one. The centroid of a symmetric smear is the target's position at the exposure midpoint.
+    When the image is not moving this is the contour engine.
+    """
+
+    name = "motion"
+
+    def __init__(self, detector, angle_tolerance=15, stretch_margin=0.25, streak_tolerance=0.35):
+        """
+        Args:
+            detector (TargetDetector): Detector the engine belongs to.
+            angle_tolerance (float): Largest angle in degrees between a blob's long axis and the x axis.
+            stretch_margin (float): Fraction the elongation may differ by from that predicted from the blur.
+            streak_tolerance (float): Fraction the blob's length and area may differ by from the predicted
+                streak's. Colour thresholding trims the faded ends of a real streak by up to about 30%.
+        """
+        super().__init__(detector)
+        self.static_engine = ContourEngine(detector)
+        self.angle_tolerance = angle_tolerance
+        self.stretch_margin = stretch_margin
+        self.streak_tolerance = streak_tolerance
+        self.speck_kernel = np.ones((3, 3), np.uint8)  # Odd, so the opening leaves blobs where they were
+
+    def find_target(self, mask, offset=(0, 0)):
+        detector = self.detector
+        blur = abs(detector.image_velocity) * detector.exposure_time
+        if blur < 1:
+            return self.static_engine.find_target(mask, offset)
+
+        # Blur mixes the blue ring with its neighbours until its sides drop out of the colour range, leaving
+        # separate arcs. Closing along the travel axis over the blur length joins them again. Specks are opened
+        # away first, or the closing merges speck fields into blobs as large as the target.
+        length = int(blur) | 1
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (length, max(3, length // 8) | 1))
+        opened = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.speck_kernel,
+                                  dst=detector.scratch.get("opened", mask.shape))
+        closed = cv2.morphologyEx(opened, cv2.MORPH_CLOSE, kernel, dst=detector.scratch.get("closed", mask.shape))
+        contours, _ = cv2.findContours(closed, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        self.lap("contours")
+
+        areas, _ = contour_measurements(contours)
+        candidates = np.flatnonzero(areas > detector.min_area)
+        for index in candidates[np.argsort(areas[candidates])[::-1]]:
+            contour = contours[index]
+            moments = cv2.moments(contour)
+            if moments["m00"] == 0:
+                continue
+            mu20, mu02, mu11 = moments["mu20"], moments["mu02"], moments["mu11"]
+            if mu20 <= 0 or mu02 <= 0:
+                continue
+
+            # Long axis along the direction of travel
+            angle = 0.5 * np.degrees(np.arctan2(2 * mu11, mu20 - mu02))
+            if abs(angle) > self.angle_tolerance:
+                continue
+
+            # A disc of radius r smeared over length L has x variance r^2/4 + L^2/12 against y variance r^2/4
+            stretch = np.sqrt(mu20 / mu02)
+            radius_squared = 4 * mu02 / moments["m00"]  # r^2 from the y variance of a disc
+            predicted = np.sqrt(1 + blur * blur / (3 * radius_squared))
+            if abs(stretch / predicted - 1) > self.stretch_margin:
+                continue
+
+            # The disc itself, not its streak, must be large enough, or smeared specks pass as targets
+            if np.pi * radius_squared <= detector.min_area:
+                continue
+
+            # The disc smeared over the blur covers 2r + blur along x and pi r^2 + 2 r blur in area
+            radius = np.sqrt(radius_squared)
+            x, y, w, h = cv2.boundingRect(contour)
+            if abs(w / (2 * radius + blur) - 1) > self.streak_tolerance:
+                continue
+            if abs(moments["m00"] / (np.pi * radius_squared + 2 * radius * blur) - 1) > self.streak_tolerance:
+                continue
+
+            # Undo the elongation and apply the normal circularity test
+            compressed = contour.reshape(-1, 2).astype(np.float64)
+            compressed[:, 0] /= stretch
+            area, perimeter = contour_measurements([compressed])
+            circularity = 4 * np.pi * area[0] / (perimeter[0] * perimeter[0]) if perimeter[0] > 0 else 0.0
+            if circularity <= detector.min_circularity:
+                continue
+
+            self.lap("filter")
+            center_x = moments["m10"] / moments["m00"] + offset[0]
+            center_y = moments["m01"] / moments["m00"] + offset[1]
+            self.lap("moments")
+            return center_x, center_y, (x + offset[0], y + offset[1], w, h), float(areas[index]), float(circularity)
+        self.lap("filter")
+        return None
+
+@register_engine
+class ComponentsEngine(DetectorEngine):
+    """
+    Uses connected-component statistics, which give the area, bounding box and centroid of every blob in
+    one pass. Circularity is only measured for candidates in area order until one passes.
+    """
+
+    name = "components"
+
+    def find_target(self, mask, offset=(0, 0)):
+        detector = self.detector
+        labels = detector.scratch.get("labels", mask.shape, np.int32)
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, labels, connectivity=8,
+                                                                           ltype=cv2.CV_32S)
+        self.lap("contours")  # Blob extraction stage, this engine does it without contours
+
+        # Label 0 is the background
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        candidates = np.flatnonzero(areas > detector.min_area) + 1
+        for label in candidates[np.argsort(areas[candidates - 1])[::-1]]:
+            x, y, w, h = stats[label, :4]
+            circularity = self.blob_circularity(labels[y:y + h, x:x + w], label)
+            if circularity > detector.min_circularity:
+                center_x, center_y = centroids[label]
+                self.lap("filter")
+                return (center_x + offset[0], center_y + offset[1], (x + offset[0], y + offset[1], w, h),
+                        float(stats[label, cv2.CC_STAT_AREA]), circularity)
+        self.lap("filter")
+        return None
+
+    @staticmethod
+    def blob_circularity(labels, label):
+        """
+        Args:
+            labels (ndarray): Label image cropped to the blob's bounding box.
+            label (int): Label of the blob.
+
+        Returns:
+            float: Circularity of the blob's outer contour, 1 for a perfect circle.
+        """
+        blob = cv2.compare(labels, int(label), cv2.CMP_EQ)
+        contours, _ = cv2.findContours(blob, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return 0.0
+        contour = max(contours, key=len)
+        perimeter = cv2.arcLength(contour, True)
+        if perimeter == 0:
+            return 0.0
+        return 4 * np.pi * cv2.contourArea(contour) / (perimeter * perimeter)
+
+@register_engine
+class HoughEngine(DetectorEngine):
+    """
+    Hough circle transform from the Tests/target detector v2/v2.py prototype, taking the largest circle.
+
+    The prototype blurred a greyscale copy of the blue pixels. Here the blur runs on the mask itself, which
+    has the same edges, so the engine shares segmentation (and the colour LUT) with the other engines. A
+    colour LUT mask holds its class bit rather than 255, so the mask is binarised to 0/255 first, or the
+    blurred edges are too weak to pass the Canny threshold.
+
+    The prototype's cv2.HOUGH_GRADIENT estimates a radius for every candidate centre, which takes seconds
+    per frame once the mask is full of speckle. cv2.HOUGH_GRADIENT_ALT (OpenCV 4.3+) is used when available:
+    it is tens of times faster on cluttered masks and its centres are sub-pixel. Older OpenCV builds fall
+    back to the prototype's method and parameters.
+    """
+
+    name = "hough"
+
+    # Method -> (dp, canny threshold, accumulator threshold). ALT's accumulator threshold is a circle
+    # "perfectness" between 0 and 1 rather than a vote count.
+    METHOD_PARAMETERS = {"gradient": (1, 100, 30), "alt": (1.5, 300, 0.9)}
+
+    def __init__(self, detector, method=None, blur_size=9, blur_sigma=2, min_dist=50, min_radius=10, max_radius=0):
+        """
+        Args:
+            detector (TargetDetector): Detector the engine belongs to.
+            method (str): "alt" or "gradient", by default "alt" if this OpenCV has it.
+            blur_size (int): Gaussian kernel size applied to the mask.
+            blur_sigma (float): Gaussian sigma.
+            min_dist (int): Minimum distance between circle centres in pixels.
+            min_radius (int): Smallest circle radius in pixels.
+            max_radius (int): Largest circle radius in pixels, 0 for no limit.
+        """
+        super().__init__(detector)
+        if method is None:
+            method = "alt" if hasattr(cv2, "HOUGH_GRADIENT_ALT") else "gradient"
+        if method not in self.METHOD_PARAMETERS:
+            raise ValueError(f"Unknown Hough method {method!r}")
+        self.method = cv2.HOUGH_GRADIENT_ALT if method == "alt" else cv2.HOUGH_GRADIENT
+        self.dp, self.canny_threshold, self.accumulator_threshold = self.METHOD_PARAMETERS[method]
+        self.blur_size = blur_size
+        self.blur_sigma = blur_sigma
+        self.min_dist = min_dist
+        self.min_radius = min_radius
+        self.max_radius = max_radius
+
+    def find_target(self, mask, offset=(0, 0)):
+        binary = cv2.compare(mask, 0, cv2.CMP_GT, dst=self.detector.scratch.get("hough_binary", mask.shape))
+        blurred = self.detector.scratch.get("hough_blurred", mask.shape)
+        cv2.GaussianBlur(binary, (self.blur_size, self.blur_size), self.blur_sigma, dst=blurred)
+        circles = cv2.HoughCircles(blurred, self.method, self.dp, minDist=self.min_dist,
+                                   param1=self.canny_threshold, param2=self.accumulator_threshold,
+                                   minRadius=self.min_radius, maxRadius=self.max_radius)
+        self.lap("contours")
+
+        if circles is None:
+            self.lap("filter")
+            return None
+
+        # Select the largest circle that is big enough to be the target
+        circles = circles[0]
+        circles = circles[np.pi * circles[:, 2] ** 2 > self.detector.min_area]
+        if len(circles) == 0:
+            self.lap("filter")
+            return None
+        center_x, center_y, radius = circles[np.argmax(circles[:, 2])]
+        self.lap("filter")
+
+        x0 = max(0, int(center_x - radius))
+        y0 = max(0, int(center_y - radius))
+        x1 = min(mask.shape[1], int(np.ceil(center_x + radius)))
+        y1 = min(mask.shape[0], int(np.ceil(center_y + radius)))
+        return (float(center_x) + offset[0], float(center_y) + offset[1],
+                (x0 + offset[0], y0 + offset[1], x1 - x0, y1 - y0), float(np.pi * radius * radius), None)
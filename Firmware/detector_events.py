@@ -0,0 +1,120 @@
+import itertools
+import threading
+import traceback
+
+class DetectorEvents:
+    """
+    Notifies controllers of detection events as each result is published, instead of them polling.
+
+    Events:
+        "measurement": every published result, with or without a target.
+        "acquired": a target is seen after a frame without one.
+        "lost": no target is seen after a frame with one.
+        "centred": the target's x displacement comes within the tolerance after a frame where it was not.
+
+    Every event carries the DetectionResult that raised it. Callbacks run on the detector thread, so they
+    should be quick and hand longer work to another thread. wait() blocks the calling thread until the
+    next occurrence of an event instead.
+    """
+
+    EVENTS = ("measurement", "acquired", "lost", "centred")
+
+    def __init__(self, centre_tolerance=1):
+        """
+        Args:
+            centre_tolerance (int): Largest absolute x displacement in pixels that counts as centred.
+        """
+        self.centre_tolerance = centre_tolerance
+        self.condition = threading.Condition()
+        self.callbacks = {event: {} for event in self.EVENTS}
+        self.tokens = itertools.count()
+        self.counts = dict.fromkeys(self.EVENTS, 0)  # Occurrences of each event, so waiters see new ones
+        self.results = dict.fromkeys(self.EVENTS)  # Result of the latest occurrence of each event
+        self.had_target = False
+        self.was_centred = False
+        self.error = None  # Error that stopped detection, raised in waiters
+
+    def check_event(self, event):
+        if event not in self.EVENTS:
+            raise ValueError(f"Unknown detector event {event!r}, expected one of {', '.join(self.EVENTS)}")
+
+    def subscribe(self, event, callback):
+        """
+        Args:
+            event (str): One of EVENTS.
+            callback (callable): Called with the DetectionResult on every occurrence of the event.
+
+        Returns:
+            int: Token for unsubscribe().
+        """
+        self.check_event(event)
+        token = next(self.tokens)
+        with self.condition:
+            self.callbacks[event][token] = callback
+        return token
+
+    def unsubscribe(self, token):
+        with self.condition:
+            for callbacks in self.callbacks.values():
+                callbacks.pop(token, None)
+
+    def wait(self, event, timeout=None):
+        """
+        Blocks until the next occurrence of an event.
+
+        Args:
+            event (str): One of EVENTS.
+            timeout (float): Seconds to wait, None for no limit.
+
+        Returns:
+            DetectionResult: The result that raised the event, or None on timeout.
+
+        Raises:
+            RuntimeError: If detection has stopped on an error, see set_error().
+        """
+        self.check_event(event)
+        with self.condition:
+            count = self.counts[event]
+            if not self.condition.wait_for(lambda: self.counts[event] != count or self.error is not None, timeout):
+                return None
+            if self.error is not None:
+                raise RuntimeError("Target detection stopped") from self.error
+            return self.results[event]
+
+    def set_error(self, error):
+        """
+        Records the error that stopped detection and wakes every waiter to raise it, or clears it with None.
+        """
+        with self.condition:
+            self.error = error
+            self.condition.notify_all()
+
+    def dispatch(self, result):
+        """
+        Raises the events a newly published result causes. Called by TargetDetector.publish().
+        """
+        has_target = result.x_displacement is not None
+        centred = has_target and abs(result.x_displacement) <= self.centre_tolerance
+
+        events = ["measurement"]
+        if has_target and not self.had_target:
+            events.append("acquired")
+        elif self.had_target and not has_target:
+            events.append("lost")
+        if centred and not self.was_centred:
+            events.append("centred")
+        self.had_target = has_target
+        self.was_centred = centred
+
+        with self.condition:
+            for event in events:
+                self.counts[event] += 1
+                self.results[event] = result
+            callbacks = [callback for event in events for callback in self.callbacks[event].values()]
+            self.condition.notify_all()
+
+        for callback in callbacks:
+            try:
+                callback(result)
+            except Exception:
+                traceback.print_exc()  # A failing subscriber must not stop detection
@@ -0,0 +1,84 @@
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+class StageTimer:
+    """
+    Per-stage timers for the detection pipeline.
+
+    The pipeline calls begin_frame(), then lap(stage) as each stage finishes, then end_frame(). A stage
+    that runs several times in one frame (e.g. a tracking window miss followed by a full-frame search)
+    is summed, so the history holds one time per stage per frame. The last `window` frames are kept for
+    the percentiles. When instrumentation is disabled the detector holds None instead of a StageTimer,
+    so the only cost left in the pipeline is an `is not None` check per stage.
+    """
+
+    STAGES = ("capture", "convert", "threshold", "contours", "filter", "moments", "draw")
+
+    def __init__(self, window=300):
+        self.lock = threading.Lock()
+        self.history = {stage: deque(maxlen=window) for stage in self.STAGES + ("total",)}
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.frame_start = 0.0
+        self.last = 0.0
+
+    def begin_frame(self):
+        for stage in self.current:
+            self.current[stage] = 0.0
+        self.frame_start = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        """
+        Charges the time since the previous lap (or begin_frame) to a stage.
+
+        Args:
+            stage (str): One of STAGES.
+        """
+        now = time.perf_counter()
+        self.current[stage] += now - self.last
+        self.last = now
+
+    def skip(self):
+        """
+        Discards the time since the previous lap, for work that belongs to no stage.
+        """
+        self.last = time.perf_counter()
+
+    def end_frame(self):
+        total = time.perf_counter() - self.frame_start
+        with self.lock:
+            for stage, elapsed in self.current.items():
+                self.history[stage].append(elapsed)
+            self.history["total"].append(total)
+
+    def report(self):
+        """
+        Returns:
+            dict: Stage -> {"p50", "p95", "p99", "mean"} in seconds, over the frames in the window.
+        """
+        with self.lock:
+            samples = {stage: np.array(values) for stage, values in self.history.items() if values}
+        return {stage: {"p50": float(np.percentile(values, 50)),
+                        "p95": float(np.percentile(values, 95)),
+                        "p99": float(np.percentile(values, 99)),
+                        "mean": float(values.mean())}
+                for stage, values in samples.items()}
+
+    def dump(self, file=None):
+        """
+        Prints the report as a table of milliseconds.
+
+        Args:
+            file: Stream to write to, stdout by default.
+        """
+        file = file or sys.stdout
+        report = self.report()
+        frames = len(self.history["total"])
+        print(f"Detector stage times over {frames} frames (ms)", file=file)
+        print(f"{'stage':<12}{'p50':>9}{'p95':>9}{'p99':>9}{'mean':>9}", file=file)
+        for stage, stats in report.items():
+            print(f"{stage:<12}" + "".join(f"{stats[key] * 1e3:>9.3f}" for key in ("p50", "p95", "p99", "mean")),
+                  file=file)
@@ -1,17 +1,27 @@
+import signal
+import sys
 import threading
 from time import sleep, time
 from target_detector import TargetDetector
+from target_tracker import TargetTracker
+from motion_calibration import MotionCalibration, calibrate_motion
+from stepper_waves import WaveStepper
+from motion_controller import MotionController
 import pigpio
-import math
 
 # Constants for navigation
-CM_TO_STEPS = 10  # Conversion factor from cm to steps
-Y_OFFSET_TO_STEPS = 10  # Conversion factor from y-offset to steps
+CM_TO_STEPS = 10  # Default conversion factor from distance to steps, until a motion calibration is saved
+Y_OFFSET_TO_STEPS = 10  # Default conversion factor from y-offset to steps, until a motion calibration is saved
 SAFE_DISTANCE = 200  # Safe distance in steps for starting deceleration
 DATUM_OFFSET = 100  # Offset of datum from camera center in steps
 ORIGIN_CLEARANCE = 1000  # Steps to clear first target from vision (actual 185 mm)
 REQ_CONSEC = 5  # Required consecutive zero-displacements for alignment
 
+# Motion limits, matching the peak speed and acceleration of the former 100 step S-curve ramps
+MAX_SPEED = 500  # Steps per second
+MAX_ACCEL = 2500  # Steps per second squared
+MAX_JERK = 25000  # Steps per second cubed, reaching full acceleration in 0.1 s
+
 # Specification constants
 PHASE_1_STOP_TIME = 7.5  # Stop time in phase 1 in seconds
 
@@ -22,43 +32,39 @@ SWITCH_PIN = 16  # Normally Open (NO) Terminal of the switch
 TRIG_PIN = 17  # Ultrasonic sensor trigger pin
 ECHO_PIN = 18  # Ultrasonic sensor echo pin
 
-def move_motor(direction, total_steps, max_speed=500, accel_steps=100):
+def move_motor(direction, total_steps, max_speed=MAX_SPEED, max_accel=MAX_ACCEL, max_jerk=MAX_JERK):
     """
-    Moves the motor with an S-curve acceleration and deceleration profile.
+    Moves the motor along the fastest jerk-limited profile the limits allow, played back by pigpio from a
+    DMA-timed wave chain. Blocks until the last step, use motion.move() to keep working during the move.
 
     Args:
         direction (int): Direction to move (1 for forward, 0 for backward).
         total_steps (int): Total number of steps to move.
-        max_speed (int): Maximum speed in steps per second.
-        accel_steps (int): Steps over which to accelerate and decelerate.
-    """
-    pi.write(DIR_PIN, direction)
-    
-    # Prepare S-curve acceleration parameters
-    accel_steps = min(accel_steps, total_steps // 2)
-    decel_start = total_steps - accel_steps
-    current_speed = 0
-
-    for step in range(total_steps):
-        phase_progress = step / accel_steps if step < accel_steps else (total_steps - step) / accel_steps
+        max_speed (float): Maximum speed in steps per second.
+        max_accel (float): Maximum acceleration in steps per second squared.
+        max_jerk (float): Maximum jerk in steps per second cubed.
 
-        # Adjust acceleration based on an S-curve profile
-        accel_factor = (1 - math.cos(math.pi * phase_progress)) / 2  # Generates an S-curve shape factor
-
-        if step < accel_steps:  # Acceleration phase
-            current_speed = max_speed * accel_factor
-        elif step >= decel_start:  # Deceleration phase
-            current_speed = max_speed * accel_factor
-        else:
-            current_speed = max_speed  # Constant speed phase
+    Returns:
+        MoveResult: Steps issued and the position afterwards.
+    """
+    return motion.move(direction, total_steps, max_speed=max_speed, max_accel=max_accel, max_jerk=max_jerk).result()
 
-        delay = 1 / (2 * max(current_speed, 1))  # Ensure delay is never zero
+def motion_progress(steps, timestamp, velocity):
+    """
+    Passes the motion controller's progress on to the tracker and detector.
 
-        # Move the motor one step
-        pi.write(STEP_PIN, 1)
-        sleep(delay)
-        pi.write(STEP_PIN, 0)
-        sleep(delay)
+    Args:
+        steps (int): Signed steps issued since the last call.
+        timestamp (float): time.monotonic() when the latest of them went out.
+        velocity (float): Signed speed in steps per second, 0 once a move has ended.
+    """
+    if steps:
+        # Log the steps at the times the hardware issued them, so measurements can be referred to their
+        # capture time
+        tracker.record_steps(steps, timestamp)
+    target_detector.set_in_motion(velocity != 0)  # Widen the tracking window while moving
+    # Forward steps move the target left in the image, the motion engine sizes its blur model from this
+    target_detector.set_image_velocity(-velocity * motion_calibration.pixels_per_step)
 
 def align(req_consec_zero_count):
     """
@@ -69,11 +75,18 @@ def align(req_consec_zero_count):
         req_consec_zero_count (int): The number of consecutive zero-displacements required for alignment.
     """
     consec_zero_count = 0  # Counter for consecutive zero-displacements
+    tracker.reset()  # Forget any previous target
 
     while consec_zero_count < req_consec_zero_count:
-        y_offset = target_detector.get_x_displacement()
-        print(f"Current Y offset: {y_offset}")
-        if y_offset == None: y_offset = 1
+        result = target_detector.wait_for("measurement", timeout=1.0)  # Wakes as soon as each frame is processed
+        if not tracker.update(result):
+            continue  # Timed out, or no target in the frame, so there is nothing new to count
+        steps_to_target = tracker.steps_to_target()  # Estimate now, including steps issued since the frame
+        if steps_to_target is None:
+            continue  # The measurement is older than the tracker's max_age, e.g. after a slow frame
+
+        y_offset = steps_to_target * motion_calibration.pixels_per_step
+        print(f"Current Y offset: {y_offset:.1f}")
 
         if abs(y_offset) <= 1:
             consec_zero_count += 1
@@ -81,11 +94,9 @@ def align(req_consec_zero_count):
         else:
             consec_zero_count = 0  # Reset counter if displacement is outside threshold
             direction = 1 if y_offset > 0 else 0  # Determine direction based on displacement
-            move_motor(direction, abs(y_offset) * Y_OFFSET_TO_STEPS)  # Adjust alignment
+            move_motor(direction, int(round(abs(steps_to_target))))  # Adjust alignment
             print("Adjusting alignment...")
 
-        sleep(0.1)  # Short delay for displacement updates
-
 def measure_distance():
     """
     Measures the distance using an ultrasonic sensor.
@@ -108,6 +119,32 @@ def measure_distance():
     
     return round(distance)
 
+def measure_x_displacement(frames=5, timeout=2.0):
+    """
+    Measures the target's x displacement from several new frames.
+
+    Args:
+        frames (int): New frames to take the median over.
+        timeout (float): Seconds to wait for the frames.
+
+    Returns:
+        float: Median displacement in pixels, or None if the target was not seen in most frames.
+    """
+    displacements = []
+    seen = 0
+    deadline = time() + timeout
+    while seen < frames and time() < deadline:
+        result = target_detector.wait_for("measurement", timeout=deadline - time())
+        if result is None:
+            break
+        seen += 1
+        if result.x_displacement is not None:
+            displacements.append(result.x_displacement)
+    if len(displacements) <= frames // 2:
+        return None
+    displacements.sort()
+    return displacements[len(displacements) // 2]
+
 def main_code():
     """
     Main code execution function.
@@ -118,22 +155,23 @@ def main_code():
 
     start_time = time()
     distance_to_wall = measure_distance()  # Measure distance to the wall
-    steps_to_wall = distance_to_wall * CM_TO_STEPS  # Convert distance to steps
+    steps_to_wall = round(distance_to_wall * motion_calibration.steps_per_mm)  # Convert distance to steps
 
     print(f"{distance_to_wall} mm to wall")
     print(f"{steps_to_wall} steps to wall")
 
     try:
-        move_motor(1, steps_to_wall)  # Move towards the wall
+        origin = motion.position
+        motion.move(1, steps_to_wall)  # Move towards the wall, watching the switch on the way
 
         while pi.read(SWITCH_PIN):  # Wait until the switch is pressed
             sleep(0.01)
 
         print("Switch pressed. Stopping motor...")
-        pi.set_PWM_dutycycle(STEP_PIN, 0)  # Stop the motor
+        motion.stop()  # Stop the motor at once, mid-move if the wall was closer than measured
 
         sleep(0.5)  # Short delay before moving back
-        move_motor(0, steps_to_wall)  # Move back to the original position
+        motion.move_to(origin).result()  # Move back to the original position, however far the move got
 
         align(REQ_CONSEC)  # Alignment process
 
@@ -147,12 +185,30 @@ def main_code():
     except KeyboardInterrupt:
         print("\nCtrl-C Pressed. Stopping PIGPIO and exiting...")
     finally:
-        pi.set_PWM_dutycycle(STEP_PIN, 0)  # Ensure motor is stopped
+        motion.close()  # Ensure motor is stopped
         pi.stop()
 
 # Initialization and setup code
 print("Initializing target detector.")
-target_detector = TargetDetector(camera_index=0, desired_width=640, desired_height=480, debug_mode=False)
+target_detector = TargetDetector(camera_index=0, desired_width=640, desired_height=480, debug_mode=False, tracking=True,
+                                 engine="motion", threaded_capture=True, instrument=True)
+
+# Load the HSV bounds saved on an earlier boot, or measure them now with the first target in view.
+# Run with --recalibrate after changing the lighting or camera.
+if target_detector.calibrate(recalibrate="--recalibrate" in sys.argv):
+    print(f"Calibrated HSV bounds {target_detector.blue_hsv_lower} - {target_detector.blue_hsv_upper}")
+
+# Step conversion factors measured by an earlier --calibrate-motion run
+motion_calibration = MotionCalibration.load()
+if motion_calibration is None:
+    print("No motion calibration found, using default conversion factors.")
+    motion_calibration = MotionCalibration(1 / CM_TO_STEPS, 1 / Y_OFFSET_TO_STEPS)
+
+# Tracks the target between frames using the steps issued by move_motor
+tracker = TargetTracker(steps_per_pixel=motion_calibration.steps_per_pixel, max_age=1.0)
+
+# Dump detector stage timings on demand with: kill -USR1 <pid>
+signal.signal(signal.SIGUSR1, lambda signum, frame: target_detector.dump_stats())
 
 print("Connecting to pigpio daemon.")
 try:
@@ -172,12 +228,23 @@ pi.set_pull_up_down(SWITCH_PIN, pigpio.PUD_UP)
 pi.set_mode(TRIG_PIN, pigpio.OUTPUT)
 pi.set_mode(ECHO_PIN, pigpio.INPUT)
 
+# Plays moves from hardware-timed wave chains on a worker thread, so sensing carries on during moves
+stepper = WaveStepper(pi, STEP_PIN, DIR_PIN)
+motion = MotionController(stepper, MAX_SPEED, MAX_ACCEL, MAX_JERK, on_progress=motion_progress)
+
 # Start the target detector and main code threads
-detector_thread = threading.Thread(target=target_detector.detect_targets)
-detector_thread.start()
+target_detector.start()
+
+# Measure the conversion factors by moving known step counts, with the wall ahead and a target in view
+if "--calibrate-motion" in sys.argv:
+    print("Calibrating motion.")
+    motion_calibration = calibrate_motion(move_motor, measure_distance, measure_x_displacement)
+    motion_calibration.save()
+    tracker.steps_per_pixel = motion_calibration.steps_per_pixel
+    print(f"{motion_calibration.mm_per_step:.4f} mm/step, {motion_calibration.pixels_per_step:.4f} px/step")
 
 main_thread = threading.Thread(target=main_code)
 main_thread.start()
 
 main_thread.join()
-detector_thread.join()
+target_detector.release()
@@ -0,0 +1,67 @@
+import numpy as np
+
+class FrameRing:
+    """
+    Fixed ring of preallocated frame buffers for the camera to read into.
+
+    A frame handed out stays valid until the ring wraps round to it again, so consumers that keep a
+    frame for a short while (debug display, tracking) must finish with it within ring_size frames.
+    """
+
+    def __init__(self, ring_size=3):
+        self.ring_size = ring_size
+        self.buffers = []
+        self.index = 0
+
+    def next(self, shape, dtype=np.uint8):
+        """
+        Args:
+            shape (tuple): Frame shape, e.g. (height, width, 3).
+            dtype: Frame dtype.
+
+        Returns:
+            ndarray: The next buffer of the ring. The ring is reallocated only if the shape changes.
+        """
+        if not self.buffers or self.buffers[0].shape != tuple(shape) or self.buffers[0].dtype != dtype:
+            self.buffers = [np.empty(shape, dtype) for _ in range(self.ring_size)]
+            self.index = 0
+        buffer = self.buffers[self.index]
+        self.index = (self.index + 1) % self.ring_size
+        return buffer
+
+class ScratchBuffers:
+    """
+    Named scratch arrays for intermediate images, reused between frames.
+
+    Each name owns one flat block that only grows. Smaller requests (tracking windows, downscaled frames)
+    are served as contiguous views of the start of the block, so OpenCV can write into them with dst=
+    without reallocating.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        """
+        Args:
+            name (str): Buffer name, one per intermediate image.
+            shape (tuple): Required shape.
+            dtype: Required dtype.
+
+        Returns:
+            ndarray: Contiguous array of the requested shape. Contents are undefined.
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        block = self.blocks.get(name)
+        if block is None or block.dtype != dtype or block.size < size:
+            block = np.empty(size, dtype)
+            self.blocks[name] = block
+        return block[:size].reshape(shape)
+
+    def nbytes(self):
+        """
+        Returns:
+            int: Total memory held by the scratch buffers.
+        """
+        return sum(block.nbytes for block in self.blocks.values())
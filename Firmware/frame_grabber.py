@@ -0,0 +1,114 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+class FrameGrabber:
+    """
+    Capture front-end that keeps the camera drained on its own thread.
+
+    The thread grabs and decodes every frame as soon as the camera produces it, so the driver queue never
+    holds stale frames. Frames are triple buffered: the thread decodes into a back buffer and swaps it
+    with the latest one, and read() swaps the latest into the buffer the processor owns. The processor
+    always gets the newest frame, frames it had no time for are dropped, and no buffer is written while
+    it is being read.
+    """
+
+    def __init__(self, cap):
+        """
+        Args:
+            cap: Opened cv2.VideoCapture, or any object with grab() and retrieve().
+        """
+        self.cap = cap
+        self.condition = threading.Condition()
+        self.is_running = False
+        self.thread = None
+        self.back = None  # Being decoded into by the grab thread
+        self.latest = None  # Newest complete frame
+        self.front = None  # Owned by the processor until its next read()
+        self.latest_timestamp = None
+        self.has_new = False
+        self.ok = True
+        self.grabbed = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def start(self):
+        """
+        Starts the grab thread.
+        """
+        if self.is_running:
+            return
+        # Ask the backend to keep as few frames queued as possible, not all backends support it
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.is_running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the grab thread and wakes any reader.
+        """
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def run(self):
+        while self.is_running:
+            ok = self.cap.grab()
+            timestamp = time.monotonic()
+            if ok:
+                if self.back is None:
+                    ok, frame = self.cap.retrieve()  # First frame sets the size of the buffers
+                    if ok:
+                        self.back = frame
+                        self.latest = np.empty_like(frame)
+                        self.front = np.empty_like(frame)
+                else:
+                    ok, _ = self.cap.retrieve(self.back)
+
+            with self.condition:
+                self.ok = ok
+                if ok:
+                    self.grabbed += 1
+                    if self.has_new:
+                        self.dropped += 1  # The previous frame was never read
+                    self.back, self.latest = self.latest, self.back
+                    self.latest_timestamp = timestamp
+                    self.has_new = True
+                self.condition.notify_all()
+            if not ok:
+                time.sleep(0.01)  # Avoid spinning on a disconnected camera
+
+    def read(self, timeout=1.0):
+        """
+        Returns the newest frame, waiting for one if the last frame has already been read.
+
+        The returned frame stays valid until the next call to read().
+
+        Args:
+            timeout (float): Seconds to wait before giving up.
+
+        Returns:
+            tuple: (ok, frame, timestamp) where timestamp is time.monotonic() when the frame was grabbed.
+        """
+        with self.condition:
+            received = self.condition.wait_for(lambda: self.has_new or not self.ok or not self.is_running, timeout)
+            if not received or not self.has_new:
+                return False, None, None
+            self.front, self.latest = self.latest, self.front
+            self.has_new = False
+            self.delivered += 1
+            return True, self.front, self.latest_timestamp
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Frames grabbed from the camera, delivered to the processor, and dropped unread.
+        """
+        with self.condition:
+            return {"grabbed": self.grabbed, "delivered": self.delivered, "dropped": self.dropped}
@@ -0,0 +1,142 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Tests", "target detector v2")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+class ImageSource:
+    """
+    Frame source that replays a list of images in place of cv2.VideoCapture.
+
+    Images are decoded once up front so replay measures the detector rather than the disk. Implements
+    the parts of the VideoCapture interface TargetDetector and FrameGrabber use.
+    """
+
+    def __init__(self, paths, loop=False, size=None, images=None):
+        """
+        Args:
+            paths (list): Image files, replayed in order.
+            loop (bool): Start again from the first image instead of ending.
+            size (tuple): Optional (width, height) to resize every image to.
+            images (list): BGR images already in memory, replayed after those read from paths.
+        """
+        self.images = []
+        for path in paths:
+            image = cv2.imread(path)
+            if image is None:
+                raise IOError(f"Cannot read image {path}")
+            if size is not None:
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            self.images.append(image)
+        for image in images or []:
+            if size is not None:
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            self.images.append(image)
+        if not self.images:
+            raise IOError("No images to replay")
+        self.loop = loop
+        self.index = 0
+        self.current = None
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return False  # Capture properties do not apply to recorded frames
+
+    def frame_count(self):
+        return len(self.images)
+
+    def grab(self):
+        if self.index >= len(self.images):
+            if not self.loop:
+                return False
+            self.index = 0
+        self.current = self.images[self.index]
+        self.index += 1
+        return True
+
+    def retrieve(self, image=None):
+        if self.current is None:
+            return False, None
+        if image is None or image.shape != self.current.shape:
+            return True, self.current.copy()
+        np.copyto(image, self.current)
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self):
+        self.images = []
+
+class VideoFileSource:
+    """
+    Frame source that replays a video file, optionally looping.
+    """
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video {path}")
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return False
+
+    def frame_count(self):
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def grab(self):
+        if self.cap.grab():
+            return True
+        if not self.loop:
+            return False
+        self.rewind()
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self):
+        self.cap.release()
+
+def open_source(spec=None, loop=False, size=None):
+    """
+    Opens a frame source from a description.
+
+    Args:
+        spec: None for the sample images in Tests/target detector v2, a directory of images, an image file,
+            or a video file.
+        loop (bool): Replay from the start when the source runs out.
+        size (tuple): Optional (width, height) to resize images to. Video frames keep their size.
+
+    Returns:
+        ImageSource or VideoFileSource.
+    """
+    if spec is None:
+        spec = SAMPLE_DIR
+    if os.path.isdir(spec):
+        paths = sorted(path for path in glob.glob(os.path.join(spec, "*"))
+                       if path.lower().endswith(IMAGE_EXTENSIONS))
+        return ImageSource(paths, loop, size)
+    if spec.lower().endswith(IMAGE_EXTENSIONS):
+        return ImageSource([spec], loop, size)
+    return VideoFileSource(spec, loop)
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hsv_calibration.json")
+CALIBRATION_VERSION = 1
+
+# Wide seed range covering the blue bounds used across the repo, only used to locate the target
+SEED_HSV_LOWER = (94, 50, 20)
+SEED_HSV_UPPER = (140, 255, 255)
+
+# Widening applied to the measured percentiles, in OpenCV HSV units
+HUE_MARGIN = 4
+SATURATION_MARGIN = 25
+VALUE_MARGIN = 40
+
+def find_target_pixels(hsv, region=None, min_area=100, min_circularity=0.7, erode=2):
+    """
+    Selects the pixels of the target's blue ring in one frame.
+
+    Args:
+        hsv (ndarray): HSV frame.
+        region (tuple): Optional (x, y, w, h) known to contain the target. Without it the largest circular
+            blob in the seed range is used.
+        min_area (int): Smallest blob area accepted as the target.
+        min_circularity (float): Smallest outer-contour circularity accepted as the target.
+        erode (int): Pixels removed from the blob edge, where colours blend with the neighbouring rings.
+
+    Returns:
+        ndarray: (N, 3) HSV values, empty if no target was found.
+    """
+    mask = cv2.inRange(hsv, np.array(SEED_HSV_LOWER), np.array(SEED_HSV_UPPER))
+    if region is not None:
+        x, y, w, h = region
+        limited = np.zeros_like(mask)
+        limited[y:y + h, x:x + w] = mask[y:y + h, x:x + w]
+        mask = limited
+
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    best = None
+    for label in np.argsort(stats[1:, cv2.CC_STAT_AREA])[::-1] + 1:
+        if stats[label, cv2.CC_STAT_AREA] <= min_area:
+            break
+        blob = cv2.compare(labels, int(label), cv2.CMP_EQ)
+        contours, _ = cv2.findContours(blob, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contour = max(contours, key=len)
+        perimeter = cv2.arcLength(contour, True)
+        if perimeter > 0 and 4 * np.pi * cv2.contourArea(contour) / (perimeter * perimeter) > min_circularity:
+            best = blob
+            break
+    if best is None:
+        return np.empty((0, 3), np.uint8)
+
+    if erode > 0:
+        best = cv2.erode(best, np.ones((2 * erode + 1, 2 * erode + 1), np.uint8))
+    return hsv[best > 0]
+
+def calibrate_hsv(frames, region=None, min_area=100, min_circularity=0.7, min_pixels=200):
+    """
+    Derives tight HSV bounds from histograms of the target pixels in a set of frames.
+
+    Hue and saturation lower bounds come from the 0.5th percentile and the hue upper bound from the 99.5th,
+    each widened by a margin. Saturation and value upper bounds stay at 255 and the value lower bound is
+    kept low, so the bounds tolerate brighter lighting and shadow but not other hues.
+
+    Args:
+        frames (list): BGR frames showing the target.
+        region (tuple): Optional (x, y, w, h) known to contain the target.
+        min_area (int): Smallest blob area accepted as the target.
+        min_circularity (float): Smallest circularity accepted as the target.
+        min_pixels (int): Fewest target pixels needed for a calibration.
+
+    Returns:
+        tuple: (hsv_lower, hsv_upper, pixels) where the bounds are uint8 arrays.
+    """
+    samples = []
+    for frame in frames:
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        samples.append(find_target_pixels(hsv, region, min_area, min_circularity))
+    pixels = np.concatenate(samples) if samples else np.empty((0, 3), np.uint8)
+    if len(pixels) < min_pixels:
+        raise RuntimeError(f"HSV calibration found only {len(pixels)} target pixels, is the target in view?")
+
+    low = np.percentile(pixels, 0.5, axis=0)
+    high = np.percentile(pixels, 99.5, axis=0)
+    lower = np.array([max(0, low[0] - HUE_MARGIN), max(0, low[1] - SATURATION_MARGIN),
+                      max(0, low[2] - VALUE_MARGIN)], np.uint8)
+    upper = np.array([min(179, high[0] + HUE_MARGIN), 255, 255], np.uint8)
+    return lower, upper, len(pixels)
+
+def load_calibration(path=DEFAULT_CALIBRATION_PATH):
+    """
+    Returns:
+        tuple: (hsv_lower, hsv_upper) uint8 arrays, or None if the file is missing, unreadable or from
+        another calibration version.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("version") != CALIBRATION_VERSION:
+            return None
+        return np.array(data["hsv_lower"], np.uint8), np.array(data["hsv_upper"], np.uint8)
+    except (OSError, KeyError, TypeError, ValueError):
+        return None
+
+def save_calibration(hsv_lower, hsv_upper, path=DEFAULT_CALIBRATION_PATH, **info):
+    """
+    Writes the bounds atomically, so an interrupted save never leaves a corrupt file behind.
+
+    Args:
+        hsv_lower (ndarray): Lower HSV bound.
+        hsv_upper (ndarray): Upper HSV bound.
+        path (str): Calibration file.
+        info: Extra values recorded for reference, e.g. pixels or resolution.
+    """
+    data = {"version": CALIBRATION_VERSION, "hsv_lower": [int(v) for v in hsv_lower],
+            "hsv_upper": [int(v) for v in hsv_upper], "created": time.strftime("%Y-%m-%d %H:%M:%S"), **info}
+    temporary = path + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temporary, path)
@@ -0,0 +1,279 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from motion_controller import MotionController
+from motion_planner import PLAN_PROFILES, plan_move
+from simulated_pigpio import SimulatedPi
+from stepper_waves import (MAX_CHAIN_LENGTH, PROFILES, Pulse, WaveStepper, chain_report, compile_periods,
+                           profile_speeds, step_periods)
+from wave_cache import MAX_WAVES, WaveCache
+
+STEP_PIN = 21
+DIR_PIN = 20
+
+def bitbang_move(pi, speeds):
+    """
+    Steps the motor the way move_motor did before the wave engine: a write and a sleep for each edge.
+    """
+    for speed in speeds:
+        delay = 1 / (2 * speed)
+        pi.write(STEP_PIN, 1)
+        time.sleep(delay)
+        pi.write(STEP_PIN, 0)
+        time.sleep(delay)
+
+def interval_error(times, periods):
+    """
+    Returns:
+        tuple: (mean, max) absolute difference in microseconds between the step intervals and the planned periods.
+    """
+    error = np.abs(np.diff(times) * 1e6 - periods[:-1])
+    return float(error.mean()), float(error.max())
+
+def benchmark_waves(args):
+    """
+    Plays the same move by bit-banging and from a wave chain on a real-time simulated pigpio, comparing the
+    achieved duration and step timing with the plan.
+    """
+    print(f"{'steps':>7}{'max speed':>11}{'method':>9}{'planned s':>11}{'actual s':>10}{'mean err us':>13}"
+          f"{'max err us':>12}{'calls':>8}")
+    for steps in args.steps:
+        speeds = profile_speeds(steps, args.max_speed, args.accel_steps, args.profile, args.min_speed)
+        periods = step_periods(speeds)
+        planned = periods.sum() / 1e6
+
+        pi = SimulatedPi()
+        start = time.monotonic()
+        bitbang_move(pi, speeds)
+        actual = time.monotonic() - start
+        rising = np.array([t for t, gpio, level in pi.writes if gpio == STEP_PIN and level == 1])
+        mean_error, max_error = interval_error(rising, periods)
+        print(f"{steps:>7}{args.max_speed:>11}{'bitbang':>9}{planned:>11.3f}{actual:>10.3f}{mean_error:>13.1f}"
+              f"{max_error:>12.1f}{pi.calls:>8}")
+
+        pi = SimulatedPi()
+        stepper = WaveStepper(pi, STEP_PIN, DIR_PIN)
+        start = time.monotonic()
+        stepper.wait(stepper.start(1, periods))
+        actual = time.monotonic() - start
+        mean_error, max_error = interval_error(pi.transmissions[-1].rising_edges(STEP_PIN), periods)
+        print(f"{steps:>7}{args.max_speed:>11}{'waves':>9}{planned:>11.3f}{actual:>10.3f}{mean_error:>13.1f}"
+              f"{max_error:>12.1f}{pi.calls:>8}")
+
+def ramp_pulses(start_frequency, final_frequency, steps):
+    """
+    Returns:
+        list: Pulses of the ramp Tests/main_test.py's move_motor plays, one step per frequency.
+    """
+    frequency_step = (final_frequency - start_frequency) / steps
+    frequency = start_frequency
+    pulses = []
+    for _ in range(steps):
+        micros = int(500000 / frequency)
+        pulses += [Pulse(1 << STEP_PIN, 0, micros), Pulse(0, 1 << STEP_PIN, micros)]
+        frequency += frequency_step
+    return pulses
+
+def prepare_ramp(pi, cache, keying, ramp):
+    """
+    Creates the waves for one of main_test's ramps: a wave per step after a wave_clear() as move_motor used
+    to, a cached wave per step period, or one cached wave for the whole ramp.
+    """
+    pulses = ramp_pulses(*ramp)
+    if keying == "uncached":
+        pi.wave_clear()
+        for i in range(0, len(pulses), 2):
+            pi.wave_add_generic(pulses[i:i + 2])
+            pi.wave_create()
+    elif keying == "step":
+        wave_ids = []
+        for i in range(0, len(pulses), 2):
+            wave_ids.append(cache.get(("step", STEP_PIN, pulses[i].delay), lambda: pulses[i:i + 2], keep=wave_ids))
+    else:
+        cache.get(("ramp", STEP_PIN) + ramp, lambda: pulses)
+
+def benchmark_cache(args):
+    """
+    Counts the daemon calls needed to prepare repeated moves with and without the wave cache, for the ramps
+    of Tests/main_test.py and the wave stepper's moves.
+    """
+    ramps = [(10, 1000, 100), (1000, 400, 100), (100, 1000, 50), (100, 1000, 100), (1000, 300, 100)]
+    moves = max(1, args.moves // len(ramps)) * len(ramps)
+    print(f"{'workload':<22}{'keying':>10}{'calls/move':>12}{'hit rate':>10}{'evictions':>11}{'waves':>7}"
+          f"{'pulses':>8}")
+    for keying in ("uncached", "step", "ramp"):
+        pi = SimulatedPi(realtime=False)
+        cache = WaveCache(pi) if keying != "uncached" else None
+        start_calls = pi.calls
+        for _ in range(moves // len(ramps)):
+            for ramp in ramps:
+                prepare_ramp(pi, cache, keying, ramp)
+        stats = cache.get_stats() if cache is not None else {"hit_rate": 0.0, "evictions": 0,
+                                                             "waves": len(pi.waves), "pulses": pi.pulses_in_use()}
+        print(f"{'main_test ramps':<22}{keying:>10}{(pi.calls - start_calls) / moves:>12.1f}"
+              f"{stats['hit_rate']:>10.1%}{stats['evictions']:>11}{stats['waves']:>7}{stats['pulses']:>8}")
+
+    pi = SimulatedPi(realtime=False)
+    stepper = WaveStepper(pi, STEP_PIN, DIR_PIN)
+    rng = np.random.default_rng(0)
+    start_calls = pi.calls
+    for move in range(args.moves):
+        stepper.move(move % 2, int(rng.integers(10, 3000)), args.max_speed, args.accel_steps, args.profile)
+    stats = stepper.cache.get_stats()
+    print(f"{'stepper moves':<22}{'contents':>10}{(pi.calls - start_calls) / args.moves:>12.1f}"
+          f"{stats['hit_rate']:>10.1%}"
+          f"{stats['evictions']:>11}{stats['waves']:>7}{stats['pulses']:>8}")
+
+def benchmark_ramp(args):
+    """
+    Compiles moves whose ramps cover a quarter of their steps each way, as a wave and loop record per step
+    like Tests/main_test.py, exactly, and quantised to each timing error, comparing chain size, waves and
+    deviation from the planned step times.
+    """
+    max_pulses = SimulatedPi().max_pulses
+    print(f"{'profile':<11}{'steps':>7}{'encoding':>11}{'levels':>8}{'chain B':>9}{'fits':>6}{'waves':>7}"
+          f"{'pulses':>8}{'mean dev us':>13}{'max dev us':>12}{'compile ms':>12}")
+    for profile in PROFILES:
+        for accel_steps in args.ramp_accel_steps:
+            steps = 4 * accel_steps
+            periods = step_periods(profile_speeds(steps, args.max_speed, accel_steps, profile, args.min_speed))
+            # main_test's move_motor created one wave per step and chained each in its own loop
+            fits = 7 * steps <= MAX_CHAIN_LENGTH and steps <= MAX_WAVES
+            print(f"{profile:<11}{steps:>7}{'per step':>11}{steps:>8}{7 * steps:>9}{'yes' if fits else 'no':>6}"
+                  f"{steps:>7}{2 * steps:>8}{0:>13.1f}"
+                  f"{0:>12.1f}{0:>12.1f}")
+            for max_error in args.errors:
+                start = time.perf_counter()
+                quantised, segments, used_error = compile_periods(periods, max_error, 16, max_pulses // 4,
+                                                                  max_pulses // 2, MAX_WAVES // 2)
+                elapsed = time.perf_counter() - start
+                report = chain_report(periods, quantised, segments, max_pulses // 4)
+                encoding = f"{max_error:g} us" if used_error == max_error else f"{max_error:g}>{used_error:g}us"
+                print(f"{profile:<11}{steps:>7}{encoding:>11}{report['levels']:>8}{report['chain_bytes']:>9}"
+                      f"{'yes':>6}{report['waves']:>7}{report['pulses']:>8}{report['mean_deviation_us']:>13.1f}"
+                      f"{report['max_deviation_us']:>12.1f}{elapsed * 1e3:>12.1f}")
+
+def loop_speeds(total_steps, max_speed, accel_steps):
+    """
+    Speed of every step computed one step at a time with math.cos, as firmware.py's move_motor did before
+    the wave engine.
+    """
+    accel_steps = min(accel_steps, total_steps // 2)
+    decel_start = total_steps - accel_steps
+    speeds = []
+    for step in range(total_steps):
+        phase_progress = step / accel_steps if step < accel_steps else (total_steps - step) / accel_steps
+        accel_factor = (1 - math.cos(math.pi * phase_progress)) / 2
+        if step < accel_steps or step >= decel_start:
+            speeds.append(max(max_speed * accel_factor, 1))
+        else:
+            speeds.append(max_speed)
+    return speeds
+
+def peak_accel(periods):
+    """
+    Returns:
+        float: Largest change of speed between consecutive steps, in steps per second squared. Each period's
+        speed is its average, so the change is over the time between the middles of the periods. Rounding
+        periods to whole microseconds adds a few thousand steps per second squared at 2000 steps per second.
+    """
+    if len(periods) < 2:
+        return 0.0
+    periods = np.asarray(periods, float) / 1e6
+    return float(np.abs(np.diff(1 / periods) / ((periods[:-1] + periods[1:]) / 2)).max())
+
+def benchmark_plan(args):
+    """
+    Plans moves with the per-step loop move_motor used, the step-indexed profiles of stepper_waves and the
+    time-based trajectory planner, comparing planning cost, move duration and the peak acceleration the
+    steps actually demand.
+    """
+    print(f"{'planner':<24}{'steps':>7}{'plan ms':>9}{'duration s':>12}{'peak speed':>12}{'peak accel':>12}")
+    planners = {
+        "loop s-curve": lambda steps: step_periods(loop_speeds(steps, args.max_speed, args.accel_steps)),
+    }
+    for profile in PROFILES:
+        planners[f"indexed {profile}"] = lambda steps, profile=profile: step_periods(
+            profile_speeds(steps, args.max_speed, args.accel_steps, profile, 1))
+    for profile in PLAN_PROFILES:
+        planners[f"planned {profile}"] = lambda steps, profile=profile: plan_move(
+            steps, args.max_speed, args.max_accel, args.max_jerk, profile).periods()
+
+    for steps in args.steps:
+        for name, planner in planners.items():
+            elapsed = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                periods = planner(steps)
+                elapsed = min(elapsed, time.perf_counter() - start)
+            print(f"{name:<24}{steps:>7}{elapsed * 1e3:>9.2f}{periods.sum() / 1e6:>12.3f}"
+                  f"{1e6 / periods.min():>12.0f}{peak_accel(periods):>12.0f}")
+
+def benchmark_controller(args):
+    """
+    Simulates a limit switch closing partway through a move on a real-time simulated pigpio, and measures
+    how long it takes to notice and how many steps go out after it: when the move blocks the control thread
+    as move_motor used to, and when the MotionController runs it while the control thread polls the switch.
+    """
+    steps = max(args.steps)
+    print(f"{'control':<26}{'steps':>7}{'switch s':>10}{'reacted s':>11}{'at rest s':>11}{'steps after':>13}")
+    for name, decel in (("blocking move", None), ("controller, stop", None), ("controller, ramp down", args.max_accel)):
+        pi = SimulatedPi()
+        stepper = WaveStepper(pi, STEP_PIN, DIR_PIN)
+        motion = MotionController(stepper, args.max_speed, args.max_accel, args.max_jerk)
+        trajectory = plan_move(steps, args.max_speed, args.max_accel, args.max_jerk)
+        switch_time = trajectory.duration / 2
+        start = time.monotonic()
+        if name == "blocking move":
+            motion.move(1, steps).result()  # Nothing can read the switch until the move returns
+        else:
+            future = motion.move(1, steps)
+            while time.monotonic() - start < switch_time:
+                time.sleep(0.01)  # main_code's switch polling interval
+            motion.stop(decel)
+            future.result()
+        reacted = max(time.monotonic() - start, switch_time)
+        motion.close()
+        edges = np.concatenate([t.start + t.rising_edges(STEP_PIN) for t in pi.transmissions]) - start
+        at_rest = edges.max() if len(edges) else 0.0
+        print(f"{name:<26}{steps:>7}{switch_time:>10.3f}{reacted:>11.3f}{at_rest:>11.3f}"
+              f"{int((edges > switch_time).sum()):>13}")
+
+BENCHMARKS = {
+    "waves": benchmark_waves,
+    "cache": benchmark_cache,
+    "ramp": benchmark_ramp,
+    "plan": benchmark_plan,
+    "controller": benchmark_controller,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stepper motion on a simulated pigpio daemon.")
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--steps", type=int, nargs="+", default=[200, 1000], help="Move lengths in steps")
+    parser.add_argument("--max-speed", type=float, default=2000, help="Cruise speed in steps per second")
+    parser.add_argument("--accel-steps", type=int, default=100)
+    parser.add_argument("--profile", choices=PROFILES, default="trapezoid")
+    parser.add_argument("--min-speed", type=float, default=50, help="Slowest step in steps per second")
+    parser.add_argument("--max-accel", type=float, default=10000, help="Planner acceleration limit in steps/s^2")
+    parser.add_argument("--max-jerk", type=float, default=200000, help="Planner jerk limit in steps/s^3")
+    parser.add_argument("--moves", type=int, default=100, help="Moves played by the cache benchmark")
+    parser.add_argument("--errors", type=float, nargs="+", default=[0, 5, 20, 50],
+                        help="Step timing errors in microseconds the ramp benchmark quantises to")
+    parser.add_argument("--ramp-accel-steps", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="Ramp lengths the ramp benchmark compiles")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import json
+import os
+import time
+
+import numpy as np
+
+DEFAULT_MOTION_CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "motion_calibration.json")
+MOTION_CALIBRATION_VERSION = 1
+
+class MotionCalibration:
+    """
+    Conversion factors between motor steps, millimetres of travel and pixels of target displacement.
+
+    Both factors are positive. Moving in direction 1 (towards the wall) shortens the ultrasonic distance
+    and reduces the target's x displacement.
+    """
+
+    def __init__(self, mm_per_step, pixels_per_step, info=None):
+        """
+        Args:
+            mm_per_step (float): Travel per motor step.
+            pixels_per_step (float): Target movement across the image per motor step.
+            info (dict): Fit details recorded with the calibration, e.g. residuals and sample counts.
+        """
+        if mm_per_step <= 0 or pixels_per_step <= 0:
+            raise ValueError("Motion calibration factors must be positive")
+        self.mm_per_step = mm_per_step
+        self.pixels_per_step = pixels_per_step
+        self.info = info or {}
+
+    @property
+    def steps_per_mm(self):
+        return 1 / self.mm_per_step
+
+    @property
+    def steps_per_pixel(self):
+        return 1 / self.pixels_per_step
+
+    @classmethod
+    def load(cls, path=DEFAULT_MOTION_CALIBRATION_PATH):
+        """
+        Returns:
+            MotionCalibration: The saved calibration, or None if the file is missing, unreadable or from
+            another calibration version.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            if data.get("version") != MOTION_CALIBRATION_VERSION:
+                return None
+            return cls(float(data["mm_per_step"]), float(data["pixels_per_step"]), data.get("info"))
+        except (OSError, KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, path=DEFAULT_MOTION_CALIBRATION_PATH):
+        """
+        Writes the calibration atomically, so an interrupted save never leaves a corrupt file behind.
+        """
+        data = {"version": MOTION_CALIBRATION_VERSION, "mm_per_step": self.mm_per_step,
+                "pixels_per_step": self.pixels_per_step, "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "info": self.info}
+        temporary = path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(data, file, indent=2)
+        os.replace(temporary, path)
+
+def fit_slope(steps, readings):
+    """
+    Least-squares slope of readings against signed step positions.
+
+    Returns:
+        tuple: (slope, rms residual).
+    """
+    steps = np.asarray(steps, float)
+    readings = np.asarray(readings, float)
+    slope, intercept = np.polyfit(steps, readings, 1)
+    residual = readings - (slope * steps + intercept)
+    return float(slope), float(np.sqrt(np.mean(residual ** 2)))
+
+def check_fit(measurement, unit, slope, residual, positions, max_residual, hint):
+    """
+    Checks a fitted slope is negative, as moving forward should reduce the reading, and that its rms residual
+    is a small fraction of the change it predicts over the calibration moves.
+
+    Raises:
+        RuntimeError: Naming the measurement, fitted slope and residual, if the fit fails either check.
+    """
+    change = abs(slope) * (max(positions) - min(positions))
+    if slope >= 0:
+        raise RuntimeError(f"The {measurement} fit has a slope of {slope:+.4f} {unit}/step, but moving forward "
+                           f"should reduce it, {hint}")
+    if residual > max_residual * change:
+        raise RuntimeError(f"The {measurement} fit of {slope:+.4f} {unit}/step is too noisy, its rms residual "
+                           f"of {residual:.3g} {unit} is over {max_residual:.0%} of the {change:.3g} {unit} "
+                           f"change it predicts, {hint}")
+
+def measure_steps_response(move, measure, step_counts, settle=0.3):
+    """
+    Moves forward through a sequence of step counts, measuring after each move, then returns to the start.
+
+    Args:
+        move (callable): move(direction, steps) issuing motor steps, blocking until done.
+        measure (callable): Returns the quantity being calibrated against, or None if it failed.
+        step_counts (list): Forward moves between measurements.
+        settle (float): Seconds to wait after each move before measuring.
+
+    Returns:
+        tuple: (positions, readings) for the successful measurements.
+    """
+    positions, readings = [], []
+    position = 0
+    for count in [0] + list(step_counts):
+        if count:
+            move(1, count)
+            position += count
+        time.sleep(settle)
+        reading = measure()
+        if reading is not None:
+            positions.append(position)
+            readings.append(reading)
+    if position:
+        move(0, position)  # Return to where calibration started
+    return positions, readings
+
+def calibrate_motion(move, measure_distance, measure_x_displacement, distance_steps=(200, 200, 200, 200),
+                     pixel_steps=(100, 100, 100, 100), settle=0.3, max_residual=0.1):
+    """
+    Derives mm-per-step from ultrasonic distances and pixels-per-step from target displacements, each
+    measured over a series of known forward moves and fitted with a straight line.
+
+    The robot must start with the wall ahead and a target in view, with room for the sum of distance_steps.
+
+    Args:
+        move (callable): move(direction, steps), e.g. firmware.move_motor.
+        measure_distance (callable): Returns the distance to the wall in millimetres.
+        measure_x_displacement (callable): Returns the target's x displacement in pixels, or None.
+        distance_steps (tuple): Moves between distance measurements.
+        pixel_steps (tuple): Moves between displacement measurements, small enough to keep the target in view
+            but large enough to move it well beyond the centroid noise, about 10 px each at 0.1 px/step.
+        settle (float): Seconds to wait after each move before measuring.
+        max_residual (float): Largest rms residual of either fit as a fraction of the change it predicts.
+
+    Returns:
+        MotionCalibration: The fitted calibration.
+
+    Raises:
+        RuntimeError: If a measurement failed too often, or its fit is the wrong sign or too noisy.
+    """
+    positions, distances = measure_steps_response(move, measure_distance, distance_steps, settle)
+    if len(positions) < 3:
+        raise RuntimeError("Too few distance measurements to calibrate mm per step")
+    distance_slope, distance_residual = fit_slope(positions, distances)
+    check_fit("ultrasonic distance", "mm", distance_slope, distance_residual, positions, max_residual,
+              "check the sensor faces the wall")
+
+    positions, displacements = measure_steps_response(move, measure_x_displacement, pixel_steps, settle)
+    if len(positions) < 3:
+        raise RuntimeError("Too few target measurements to calibrate pixels per step, is a target in view?")
+    pixel_slope, pixel_residual = fit_slope(positions, displacements)
+    check_fit("target pixel displacement", "px", pixel_slope, pixel_residual, positions, max_residual,
+              "check the target stays in view and is the only one detected")
+
+    # Moving forward shortens the distance and reduces the displacement, so both slopes are negative
+    return MotionCalibration(-distance_slope, -pixel_slope,
+                             {"distance_rms_mm": distance_residual, "distance_samples": len(distances),
+                              "pixel_rms": pixel_residual, "pixel_samples": len(displacements)})
@@ -0,0 +1,283 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+from motion_planner import plan_move, stopping_periods
+
+# Outcome of a move: signed steps issued, position afterwards, and whether stop() cut it short
+MoveResult = namedtuple("MoveResult", ("steps", "position", "stopped"))
+
+class MotionController:
+    """
+    Runs moves on a worker thread so the caller can keep sensing while the motor turns.
+
+    move() and move_to() queue a move and return a concurrent.futures.Future straight away, resolved with a
+    MoveResult once its last step has gone out; move_async() and move_to_async() await the same from a
+    coroutine. Queued moves run one after another. The position and velocity can be read at any time from
+    the step times of the move being played, and stop() cancels the running and queued moves, either at
+    once or with a constant deceleration ramp that is prepared while the move still plays.
+
+    Positions are in steps, positive for direction 1, from where the controller was created or last reset.
+    """
+
+    def __init__(self, stepper, max_speed, max_accel, max_jerk=None, profile="jerk-limited", on_progress=None,
+                 poll=0.005):
+        """
+        Args:
+            stepper (WaveStepper): Stepper driver that plays the moves.
+            max_speed (float): Default speed limit in steps per second.
+            max_accel (float): Default acceleration limit in steps per second squared.
+            max_jerk (float): Default jerk limit in steps per second cubed.
+            profile (str): Default motion_planner profile.
+            on_progress (callable): Called on the worker thread every poll interval of a move with the signed
+                steps issued since the last call, the time.monotonic() the latest of them went out and the
+                signed velocity in steps per second, which is 0 on the last call of a move.
+            poll (float): Seconds between progress checks.
+        """
+        self.stepper = stepper
+        self.limits = {"max_speed": max_speed, "max_accel": max_accel, "max_jerk": max_jerk, "profile": profile}
+        self.on_progress = on_progress
+        self.poll = poll
+
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()  # (future, move request, stop generation) triples, None to end the worker
+        self.base_position = 0  # Position before the chain being played
+        self.playing = None  # (WaveMove, step sign) of the chain being played
+        self.current_future = None  # Future of the move being run
+        self.stop_generation = 0  # Counts stop() calls, moves queued before the latest one are cancelled
+        self.stop_event = threading.Event()
+        self.stop_decel = None
+        self.worker = threading.Thread(target=self.run, name="MotionController", daemon=True)
+        self.worker.start()
+
+    @property
+    def position(self):
+        """
+        Steps from the origin, including those issued so far by the move being played.
+        """
+        with self.lock:
+            playing = self.playing
+            position = self.base_position
+        if playing is None:
+            return position
+        move, sign = playing
+        return position + sign * move.steps_done()
+
+    @property
+    def velocity(self):
+        """
+        Signed speed in steps per second, 0 when stopped.
+        """
+        playing = self.playing
+        if playing is None:
+            return 0.0
+        move, sign = playing
+        return sign * move.speed_at()
+
+    @property
+    def is_moving(self):
+        return self.current_future is not None or not self.requests.empty()
+
+    def move(self, direction, distance, **limits):
+        """
+        Queues a move by a number of steps.
+
+        Args:
+            direction (int): Direction to move (1 for forward, 0 for backward).
+            distance (int): Steps to move.
+            **limits: max_speed, max_accel, max_jerk or profile overriding the controller's defaults.
+
+        Returns:
+            Future: Resolved with a MoveResult when the move ends.
+        """
+        return self.submit(("move", direction, int(distance), limits))
+
+    def move_to(self, position, **limits):
+        """
+        Queues a move to a position, measured from wherever the moves queued before it leave the motor.
+
+        Args:
+            position (int): Target position in steps.
+            **limits: max_speed, max_accel, max_jerk or profile overriding the controller's defaults.
+
+        Returns:
+            Future: Resolved with a MoveResult when the move ends.
+        """
+        return self.submit(("move_to", None, int(position), limits))
+
+    async def move_async(self, direction, distance, **limits):
+        """
+        Returns:
+            MoveResult: Result of move(), awaited without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.move(direction, distance, **limits))
+
+    async def move_to_async(self, position, **limits):
+        """
+        Returns:
+            MoveResult: Result of move_to(), awaited without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.move_to(position, **limits))
+
+    def submit(self, request):
+        for name in request[3]:
+            if name not in self.limits:
+                raise ValueError(f"Unknown motion limit {name!r}, expected one of {', '.join(self.limits)}")
+        if not self.worker.is_alive():
+            raise RuntimeError("The motion controller has been closed")
+        future = Future()
+        with self.lock:
+            generation = self.stop_generation
+        self.requests.put((future, request, generation))
+        return future
+
+    def stop(self, decel=None):
+        """
+        Cancels the queued moves and stops the running one.
+
+        Args:
+            decel (float): Deceleration in steps per second squared to ramp down at, None to stop at once.
+                A move already due to stop sooner is left to finish.
+
+        Returns:
+            Future: Future of the move being stopped, resolved once the motor is at rest, or None if idle.
+        """
+        with self.lock:
+            self.stop_generation += 1  # Also cancels a move the worker has taken but not yet started
+        while True:
+            try:
+                item = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.requests.put(None)  # Keep the close request
+                break
+            item[0].cancel()
+        with self.lock:
+            future = self.current_future
+            if future is not None:
+                self.stop_decel = decel
+                self.stop_event.set()
+        return future
+
+    def reset_position(self, position=0):
+        """
+        Sets the current position, e.g. at a datum. Only while no move is running.
+        """
+        with self.lock:
+            if self.current_future is not None:
+                raise RuntimeError("Cannot reset the position during a move")
+            self.base_position = int(position)
+
+    def close(self):
+        """
+        Stops the motor at once and ends the worker thread.
+        """
+        self.stop()
+        self.requests.put(None)
+        self.worker.join()
+
+    def run(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                break
+            future, request, generation = item
+            # Claim the move under the lock stop() takes, so a stop either cancels it here or finds it current
+            with self.lock:
+                if generation != self.stop_generation:
+                    future.cancel()  # Stopped after it was queued
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue  # Cancelled while queued
+                self.current_future = future
+                self.stop_event.clear()
+            try:
+                result = self.execute(request)
+            except Exception as error:
+                with self.lock:
+                    self.current_future = None
+                future.set_exception(error)
+            else:
+                with self.lock:
+                    self.current_future = None
+                future.set_result(result)
+
+    def execute(self, request):
+        # Plans and plays one move, returning its MoveResult
+        kind, direction, value, overrides = request
+        limits = dict(self.limits, **overrides)
+        start_position = self.base_position
+        if kind == "move_to":
+            direction = 1 if value > start_position else 0
+            distance = abs(value - start_position)
+        else:
+            distance = value
+        sign = 1 if direction else -1
+
+        stopped = False
+        if distance > 0:
+            trajectory = plan_move(distance, limits["max_speed"], limits["max_accel"], limits["max_jerk"],
+                                   limits["profile"])
+            move = self.stepper.start(direction, trajectory.periods())
+            stopped = self.follow(move, sign)
+        return MoveResult(self.base_position - start_position, self.base_position, stopped)
+
+    def follow(self, move, sign):
+        # Reports progress until the chain ends, switching to a ramp-down chain if stop() asks for one
+        self.set_playing(move, sign)
+        logged = 0
+        stopped = False
+        while self.stepper.is_busy():
+            if self.stop_event.is_set():
+                self.stop_event.clear()
+                stopped = True
+                ramp = self.prepare_stop(move)
+                if ramp is None:
+                    self.stepper.stop()
+                    break
+                if move.total_steps - move.steps_done() > len(ramp[0]):
+                    # Switch chains with two daemon calls, the ramp's waves were created while the move played
+                    self.stepper.stop()
+                    self.report(move, sign, logged, final=False)
+                    self.finish_chain(move, sign)
+                    move, logged = self.stepper.play(move.direction, ramp), 0
+                    self.set_playing(move, sign)
+                continue  # Otherwise the move already stops sooner than the ramp would
+            logged = self.report(move, sign, logged, final=False)
+            time.sleep(self.poll)
+        self.report(move, sign, logged, final=True)
+        self.finish_chain(move, sign)
+        if move is self.stepper.current:
+            self.stepper.finish()
+        return stopped
+
+    def set_playing(self, move, sign):
+        with self.lock:
+            self.playing = (move, sign)
+
+    def prepare_stop(self, move):
+        # Waves for ramping down from the present speed, or None to stop at once
+        decel = self.stop_decel
+        if decel is None:
+            return None
+        periods = stopping_periods(move.speed_at(), decel)
+        if not len(periods):
+            return None
+        return self.stepper.prepare(periods)
+
+    def report(self, move, sign, logged, final):
+        # Passes the steps issued since the last report to on_progress, returning the steps now logged
+        done = move.steps_done()
+        if self.on_progress is not None and (done > logged or final):
+            timestamp = move.start + move.step_times[done - 1] if done else move.start
+            self.on_progress(sign * (done - logged), timestamp, 0.0 if final else sign * move.speed_at())
+        return done
+
+    def finish_chain(self, move, sign):
+        with self.lock:
+            self.base_position += sign * move.steps_done()
+            self.playing = None
@@ -0,0 +1,197 @@
+import math
+
+import numpy as np
+
+PLAN_PROFILES = ("trapezoid", "s-curve", "jerk-limited")
+
+def ramp_time(profile, speed, max_accel, max_jerk=None):
+    """
+    Returns:
+        float: Seconds to accelerate from rest to the speed without exceeding the limits.
+    """
+    if profile == "trapezoid":
+        return speed / max_accel
+    if profile == "s-curve":
+        return math.pi * speed / (2 * max_accel)  # Raised cosine velocity, peaking at max_accel halfway
+    if speed >= max_accel ** 2 / max_jerk:
+        return speed / max_accel + max_accel / max_jerk  # Reaches max_accel and holds it
+    return 2 * math.sqrt(speed / max_jerk)  # Too slow a move to reach max_accel
+
+def reachable_speed(profile, distance, max_accel, max_jerk=None):
+    """
+    Returns:
+        float: Highest speed from which the move can still stop within the distance, accelerating from and
+        decelerating to rest. Each ramp covers half its time at the speed, so the ramps take speed *
+        ramp_time(speed).
+    """
+    if profile == "trapezoid":
+        return math.sqrt(distance * max_accel)
+    if profile == "s-curve":
+        return math.sqrt(2 * max_accel * distance / math.pi)
+    speed = (distance * math.sqrt(max_jerk) / 2) ** (2 / 3)
+    if speed < max_accel ** 2 / max_jerk:
+        return speed
+    ratio = max_accel / max_jerk
+    return max_accel * (math.sqrt(ratio ** 2 + 4 * distance / max_accel) - ratio) / 2
+
+class Trajectory:
+    """
+    Fastest move from rest to rest of a profile's shape, under limits on speed, acceleration and, for the
+    jerk-limited profile, jerk. The jerk-limited profile is the time-optimal one for all three limits.
+
+    "trapezoid" holds max_accel, "s-curve" ramps the speed as a raised cosine in time peaking at max_accel,
+    and "jerk-limited" ramps the acceleration at max_jerk, the seven segment profile. Positions, speeds and
+    step times are evaluated for whole arrays at once, so planning a move costs a few NumPy calls instead of
+    a Python loop over its steps.
+    """
+
+    def __init__(self, distance, max_speed, max_accel, max_jerk=None, profile="jerk-limited"):
+        """
+        Args:
+            distance (int): Steps to move.
+            max_speed (float): Speed limit in steps per second.
+            max_accel (float): Acceleration limit in steps per second squared.
+            max_jerk (float): Jerk limit in steps per second cubed, needed by the jerk-limited profile.
+            profile (str): One of PLAN_PROFILES.
+
+        Raises:
+            ValueError: For an unknown profile, a missing jerk limit or limits that are not positive.
+        """
+        if profile not in PLAN_PROFILES:
+            raise ValueError(f"Unknown motion profile {profile!r}, expected one of {', '.join(PLAN_PROFILES)}")
+        if profile == "jerk-limited" and max_jerk is None:
+            raise ValueError("The jerk-limited profile needs max_jerk")
+        if max_speed <= 0 or max_accel <= 0 or (max_jerk is not None and max_jerk <= 0):
+            raise ValueError("Speed, acceleration and jerk limits must be positive")
+        if distance < 0:
+            raise ValueError(f"Distance must be at least 0 steps, got {distance}")
+
+        self.distance = int(distance)
+        self.profile = profile
+        self.max_accel = max_accel
+        self.max_jerk = max_jerk
+        self.peak_speed = min(max_speed, reachable_speed(profile, distance, max_accel, max_jerk)) if distance else 0.0
+        self.ramp_time = ramp_time(profile, self.peak_speed, max_accel, max_jerk) if distance else 0.0
+        self.ramp_distance = self.peak_speed * self.ramp_time / 2
+        self.cruise_time = (distance - 2 * self.ramp_distance) / self.peak_speed if distance else 0.0
+        self.cruise_time = max(self.cruise_time, 0.0)  # Rounding when the move is all ramps
+        self.duration = 2 * self.ramp_time + self.cruise_time
+
+    def ramp(self, tau):
+        # Position and speed tau seconds into the acceleration ramp, for tau within [0, ramp_time]
+        speed, duration = self.peak_speed, self.ramp_time
+        if self.profile == "trapezoid":
+            return speed * tau ** 2 / (2 * duration), speed * tau / duration
+        if self.profile == "s-curve":
+            angle = np.pi * tau / duration
+            return speed / 2 * (tau - duration / np.pi * np.sin(angle)), speed / 2 * (1 - np.cos(angle))
+
+        jerk = self.max_jerk
+        jerk_time = min(self.max_accel / jerk, math.sqrt(speed / jerk))
+        accel = jerk * jerk_time
+        jerk_speed = jerk * jerk_time ** 2 / 2
+        constant = tau - jerk_time  # Time into the constant acceleration segment
+        mirrored = duration - tau  # The ramp's speed is symmetric, speed(duration - tau) = peak - speed(tau)
+        return (np.select([tau < jerk_time, mirrored > jerk_time],
+                          [jerk * tau ** 3 / 6,
+                           jerk * jerk_time ** 3 / 6 + jerk_speed * constant + accel * constant ** 2 / 2],
+                          speed * tau - speed * duration / 2 + jerk * mirrored ** 3 / 6),
+                np.select([tau < jerk_time, mirrored > jerk_time],
+                          [jerk * tau ** 2 / 2, jerk_speed + accel * constant],
+                          speed - jerk * mirrored ** 2 / 2))
+
+    def state(self, timestamps):
+        """
+        Args:
+            timestamps (ndarray): Seconds from the start of the move, clipped to the move.
+
+        Returns:
+            tuple: (positions in steps, speeds in steps per second) at the timestamps.
+        """
+        t = np.clip(np.asarray(timestamps, float), 0, self.duration)
+        if not self.distance:
+            return np.zeros_like(t), np.zeros_like(t)
+        accel_position, accel_speed = self.ramp(np.minimum(t, self.ramp_time))
+        decel_position, decel_speed = self.ramp(np.clip(self.duration - t, 0, self.ramp_time))
+        cruise_end = self.ramp_time + self.cruise_time
+        position = np.select([t < self.ramp_time, t <= cruise_end],
+                             [accel_position, self.ramp_distance + self.peak_speed * (t - self.ramp_time)],
+                             self.distance - decel_position)
+        speed = np.select([t < self.ramp_time, t <= cruise_end], [accel_speed, self.peak_speed], decel_speed)
+        return position, speed
+
+    def step_times(self, resolution=1e-7):
+        """
+        Times of the steps, step k being issued when the planned position reaches k - 0.5 so the motor is
+        never more than half a step off the plan. Steps in the cruise are solved directly, and those in the
+        ramps all at once by bisection on the ramp's monotonic position.
+
+        Args:
+            resolution (float): Seconds to resolve each step time to.
+
+        Returns:
+            ndarray: Seconds from the start of the move of each of its steps.
+        """
+        targets = np.arange(self.distance) + 0.5
+        if not self.distance:
+            return targets
+        times = self.ramp_time + (targets - self.ramp_distance) / self.peak_speed
+        # The deceleration ramp mirrors the acceleration ramp, so both are solved as distances from rest
+        from_rest = np.minimum(targets, self.distance - targets)
+        in_ramp = from_rest < self.ramp_distance
+        goal = from_rest[in_ramp]
+        low = np.zeros(len(goal))
+        high = np.full(len(goal), self.ramp_time)
+        for _ in range(max(1, math.ceil(math.log2(max(self.ramp_time, resolution) / resolution)))):
+            middle = (low + high) / 2
+            below = self.ramp(middle)[0] < goal
+            low = np.where(below, middle, low)
+            high = np.where(below, high, middle)
+        tau = (low + high) / 2
+        times[in_ramp] = np.where(targets[in_ramp] < self.distance / 2, tau, self.duration - tau)
+        return times
+
+    def periods(self):
+        """
+        Returns:
+            ndarray: Whole-microsecond step periods for WaveStepper.start(), each from a step to the next and
+            the last to the end of the move. The half step before the first step is not waited for.
+        """
+        if not self.distance:
+            return np.empty(0, np.int64)
+        edges = np.append(self.step_times(), self.duration)
+        return np.maximum(np.round(np.diff(edges) * 1e6), 2).astype(np.int64)
+
+def plan_move(distance, max_speed, max_accel, max_jerk=None, profile="jerk-limited"):
+    """
+    Returns:
+        Trajectory: Time-optimal move of the distance in steps under the limits, see Trajectory.
+    """
+    return Trajectory(distance, max_speed, max_accel, max_jerk, profile)
+
+def stopping_periods(speed, decel):
+    """
+    Step periods that bring a move running at a speed to rest at a constant deceleration, step k being
+    issued when the stopping distance covered reaches k + 0.5.
+
+    Args:
+        speed (float): Speed at the start of the ramp in steps per second.
+        decel (float): Deceleration in steps per second squared.
+
+    Returns:
+        ndarray: Whole-microsecond step periods, empty if the move stops within half a step.
+
+    Raises:
+        ValueError: If the deceleration is not positive.
+    """
+    if decel <= 0:
+        raise ValueError(f"Deceleration must be positive, got {decel}")
+    speed = abs(speed)
+    distance = speed ** 2 / (2 * decel)
+    targets = np.arange(math.floor(distance + 0.5)) + 0.5
+    targets = targets[targets <= distance]
+    if not len(targets):
+        return np.empty(0, np.int64)
+    times = (speed - np.sqrt(np.maximum(speed ** 2 - 2 * decel * targets, 0))) / decel
+    edges = np.append(times, speed / decel) - times[0]  # The first step goes out as the ramp starts
+    return np.maximum(np.round(np.diff(edges) * 1e6), 2).astype(np.int64)
@@ -0,0 +1,196 @@
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from target_detector import TargetDetector
+
+def worker_main(frames_name, masks_name, slots, frame_shape, tasks, results, attributes, detector_kwargs):
+    """
+    Worker process loop. Frames are read from, and stripe masks written to, shared memory, so only slot
+    numbers and results go through the queues.
+    """
+    frames_memory = shared_memory.SharedMemory(name=frames_name)
+    masks_memory = shared_memory.SharedMemory(name=masks_name)
+    frames = np.ndarray((slots,) + frame_shape, np.uint8, buffer=frames_memory.buf)
+    masks = np.ndarray((slots,) + frame_shape[:2], np.uint8, buffer=masks_memory.buf)
+    detector = TargetDetector(camera_index=None, **detector_kwargs)
+    for name, value in attributes.items():
+        setattr(detector, name, value)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            frame_id, slot, rows = task
+            if rows is None:
+                results.put((frame_id, detector.process_frame(frames[slot])))
+            else:
+                y0, y1 = rows
+                masks[slot, y0:y1] = detector.segment(frames[slot, y0:y1])
+                results.put((frame_id, None))
+    finally:
+        del frames, masks
+        frames_memory.close()
+        masks_memory.close()
+
+class ParallelDetector:
+    """
+    Runs target detection in worker processes, so it uses all cores instead of competing for one GIL.
+
+    Frames are copied into a ring of shared-memory slots. In "frames" mode each frame goes to one worker
+    and several frames are in flight at once. In "stripes" mode every worker segments a horizontal stripe
+    of the same frame into a shared mask, and the blob stage runs on the whole mask in this process, so a
+    target crossing a stripe boundary is still found in one piece. Results are returned in frame order
+    either way. Tracking is not used because consecutive frames may go to different workers.
+
+    Workers are started with the "spawn" method, which re-imports the main script, so a script that
+    creates a ParallelDetector must keep its top-level code under `if __name__ == "__main__":`.
+    """
+
+    MODES = ("frames", "stripes")
+
+    def __init__(self, frame_shape, workers=2, mode="frames", slots=None, attributes=None, **detector_kwargs):
+        """
+        Args:
+            frame_shape (tuple): (height, width, 3) of the frames that will be submitted.
+            workers (int): Number of worker processes.
+            mode (str): "frames" or "stripes".
+            slots (int): Shared frame buffers, i.e. frames in flight. Defaults to two per worker.
+            attributes (dict): Detector attributes to override in every worker, e.g. blue_hsv_lower.
+            detector_kwargs: Passed to the TargetDetector in each worker, e.g. engine or pyramid_scale.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown parallel mode {mode!r}, expected one of {', '.join(self.MODES)}")
+        detector_kwargs.pop("tracking", None)
+        self.frame_shape = tuple(frame_shape)
+        self.workers = workers
+        self.mode = mode
+        self.slots = slots or (2 * workers if mode == "frames" else 2)
+
+        frame_bytes = int(np.prod(self.frame_shape))
+        self.frames_memory = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slots)
+        self.masks_memory = shared_memory.SharedMemory(create=True, size=frame_bytes // 3 * self.slots)
+        self.frames = np.ndarray((self.slots,) + self.frame_shape, np.uint8, buffer=self.frames_memory.buf)
+        self.masks = np.ndarray((self.slots,) + self.frame_shape[:2], np.uint8, buffer=self.masks_memory.buf)
+
+        # Stripe mode still finds blobs in this process
+        attributes = attributes or {}
+        self.detector = TargetDetector(camera_index=None, **detector_kwargs)
+        for name, value in attributes.items():
+            setattr(self.detector, name, value)
+
+        # Spawn rather than fork, the parent may already be running capture threads
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.processes = [context.Process(target=worker_main, daemon=True,
+                                          args=(self.frames_memory.name, self.masks_memory.name, self.slots,
+                                                self.frame_shape, self.tasks, self.results, attributes,
+                                                detector_kwargs))
+                          for _ in range(workers)]
+        for process in self.processes:
+            process.start()
+
+        height = self.frame_shape[0]
+        bounds = np.linspace(0, height, workers + 1).astype(int)
+        self.stripes = list(zip(bounds[:-1], bounds[1:]))
+
+        self.free_slots = list(range(self.slots))
+        self.next_id = 0
+        self.next_to_emit = 0
+        self.pending = {}  # frame_id -> [slot, timestamp, stripes outstanding]
+        self.done = {}  # frame_id -> (timestamp, target) awaiting earlier frames
+
+    def submit(self, frame, timestamp=None):
+        """
+        Queues a frame for detection. Blocks while all slots are in use.
+
+        Args:
+            frame (ndarray): BGR frame of frame_shape.
+            timestamp: Returned with the frame's result.
+        """
+        while not self.free_slots:
+            self.receive(block=True)
+        slot = self.free_slots.pop()
+        np.copyto(self.frames[slot], frame)
+
+        frame_id = self.next_id
+        self.next_id += 1
+        if self.mode == "frames":
+            self.pending[frame_id] = [slot, timestamp, 1]
+            self.tasks.put((frame_id, slot, None))
+        else:
+            self.pending[frame_id] = [slot, timestamp, len(self.stripes)]
+            for rows in self.stripes:
+                self.tasks.put((frame_id, slot, rows))
+
+    def receive(self, block=False):
+        """
+        Takes one message from the workers and completes its frame if all of its work is back.
+
+        Returns:
+            bool: False if block is False and no message was waiting.
+        """
+        while True:
+            try:
+                frame_id, target = self.results.get(block=block, timeout=0.5 if block else None)
+                break
+            except queue.Empty:
+                if not block:
+                    return False
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError("A detection worker process has exited")
+
+        entry = self.pending[frame_id]
+        entry[2] -= 1
+        if entry[2] > 0:
+            return True
+
+        slot, timestamp, _ = self.pending.pop(frame_id)
+        if self.mode == "stripes":
+            target = self.detector.find_target_mask(self.masks[slot])
+        self.free_slots.append(slot)
+        self.done[frame_id] = (timestamp, target)
+        return True
+
+    def collect(self, block=False):
+        """
+        Returns finished results in frame order.
+
+        Args:
+            block (bool): Wait until at least the next frame in order is finished, if any are in flight.
+
+        Returns:
+            list: (timestamp, target) tuples, target is as returned by TargetDetector.find_target(), or None
+            where no target was found.
+        """
+        while self.receive(block=False):
+            pass
+        while block and self.pending and self.next_to_emit not in self.done:
+            self.receive(block=True)
+
+        ready = []
+        while self.next_to_emit in self.done:
+            ready.append(self.done.pop(self.next_to_emit))
+            self.next_to_emit += 1
+        return ready
+
+    def in_flight(self):
+        return len(self.pending) + len(self.done)
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory.
+        """
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        del self.frames, self.masks
+        for memory in (self.frames_memory, self.masks_memory):
+            memory.close()
+            memory.unlink()
@@ -0,0 +1,168 @@
+import cv2
+import numpy as np
+
+from frame_source import ImageSource
+
+# Ring radii of the course target as fractions of the blue ring's outer radius, outermost first (BGR colours)
+TARGET_RINGS = [
+    (1.55, (0, 0, 0)),
+    (1.0, (255, 0, 0)),
+    (0.54, (0, 0, 255)),
+    (0.23, (0, 255, 255)),
+    (0.08, (255, 255, 255)),
+]
+
+# OpenCV hues of the blue target, avoided when colouring large clutter so it cannot pass as a target
+BLUE_HUES = (95, 140)
+
+class SceneGenerator:
+    """
+    Renders frames containing a blue circular target with exact ground-truth centroids.
+
+    Each frame varies the target size and position, lighting, sensor noise, horizontal motion blur and
+    background clutter within the configured ranges. Sizes are fractions of the frame height so the same
+    generator works at any resolution. The target is drawn anti-aliased at a sub-pixel centre, and blur,
+    lighting and noise are all symmetric about it, so the ground truth is the drawn centre, moved half a
+    pixel right by blurs of even length.
+    """
+
+    def __init__(self, width=640, height=480, seed=0, style="rings", radius_range=(0.05, 0.25),
+                 brightness_range=(0.6, 1.3), gradient_range=(0.0, 0.4), noise_range=(0.0, 10.0),
+                 blur_range=(0, 25), clutter_range=(0, 30), speck_range=(0, 200), target_probability=1.0):
+        """
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+            seed (int): Random seed, the same seed gives the same frames.
+            style (str): "rings" for the course target, "disc" for a plain blue disc.
+            radius_range (tuple): Blue radius as a fraction of the frame height.
+            brightness_range (tuple): Overall gain applied to the scene.
+            gradient_range (tuple): Strength of a left-to-right lighting gradient.
+            noise_range (tuple): Standard deviation of Gaussian sensor noise in grey levels.
+            blur_range (tuple): Horizontal motion blur length in pixels.
+            clutter_range (tuple): Number of non-blue background shapes.
+            speck_range (tuple): Number of small blue specks, smaller than a valid target.
+            target_probability (float): Chance that a frame contains a target at all.
+        """
+        if style not in ("rings", "disc"):
+            raise ValueError(f"Unknown target style {style!r}")
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.style = style
+        self.radius_range = radius_range
+        self.brightness_range = brightness_range
+        self.gradient_range = gradient_range
+        self.noise_range = noise_range
+        self.blur_range = blur_range
+        self.clutter_range = clutter_range
+        self.speck_range = speck_range
+        self.target_probability = target_probability
+
+    def uniform(self, value_range):
+        return self.rng.uniform(*value_range)
+
+    def integer(self, value_range):
+        return int(self.rng.integers(value_range[0], value_range[1] + 1))
+
+    def clutter_colour(self):
+        # Pick a hue outside the blue band
+        hue = int(self.rng.integers(0, 180 - (BLUE_HUES[1] - BLUE_HUES[0])))
+        if hue >= BLUE_HUES[0]:
+            hue += BLUE_HUES[1] - BLUE_HUES[0]
+        hsv = np.uint8([[[hue, self.rng.integers(0, 256), self.rng.integers(40, 256)]]])
+        return tuple(int(v) for v in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0])
+
+    def draw_clutter(self, frame):
+        for _ in range(self.integer(self.clutter_range)):
+            colour = self.clutter_colour()
+            x, y = int(self.rng.integers(0, self.width)), int(self.rng.integers(0, self.height))
+            size = int(self.rng.integers(5, max(6, self.height // 4)))
+            shape = self.rng.integers(0, 3)
+            if shape == 0:
+                cv2.rectangle(frame, (x, y), (x + size, y + int(self.rng.integers(5, size + 6))), colour, -1)
+            elif shape == 1:
+                cv2.circle(frame, (x, y), size // 2, colour, -1)
+            else:
+                end = (int(self.rng.integers(0, self.width)), int(self.rng.integers(0, self.height)))
+                cv2.line(frame, (x, y), end, colour, int(self.rng.integers(1, 6)))
+
+        # Blue specks below the detector's minimum target area
+        for _ in range(self.integer(self.speck_range)):
+            x, y = int(self.rng.integers(0, self.width)), int(self.rng.integers(0, self.height))
+            cv2.circle(frame, (x, y), int(self.rng.integers(1, 4)), (255, 0, 0), -1)
+
+    def draw_target(self, frame, center_x, center_y, radius):
+        shift = 4  # Sub-pixel drawing with 4 fractional bits
+        scale = 1 << shift
+        center = (int(round(center_x * scale)), int(round(center_y * scale)))
+        rings = TARGET_RINGS if self.style == "rings" else [(1.0, (255, 0, 0))]
+        for fraction, colour in rings:
+            cv2.circle(frame, center, int(round(radius * fraction * scale)), colour, -1, cv2.LINE_AA, shift)
+
+    def generate(self):
+        """
+        Renders one frame.
+
+        Returns:
+            tuple: (frame, truth) where truth is (center_x, center_y, radius) in pixels, or None if the frame
+            has no target.
+        """
+        frame = np.empty((self.height, self.width, 3), np.uint8)
+        frame[:] = self.rng.integers(120, 230, 3)  # Plain background of a random colour
+        self.draw_clutter(frame)
+
+        truth = None
+        if self.rng.random() < self.target_probability:
+            radius = self.uniform(self.radius_range) * self.height
+            outer = radius * (TARGET_RINGS[0][0] if self.style == "rings" else 1.0)
+            outer = min(outer, (min(self.width, self.height) - 2) / 2)
+            center_x = self.rng.uniform(outer, self.width - outer)
+            center_y = self.rng.uniform(outer, self.height - outer)
+            self.draw_target(frame, center_x, center_y, radius)
+            truth = (center_x, center_y, radius)
+
+        image = frame.astype(np.float32)
+
+        # Motion blur along the direction of travel
+        length = self.integer(self.blur_range)
+        if length > 1:
+            kernel = np.full((1, length), 1.0 / length, np.float32)
+            image = cv2.filter2D(image, -1, kernel, borderType=cv2.BORDER_REFLECT)
+            if length % 2 == 0 and truth is not None:
+                # An even kernel has no centre pixel, the default anchor at length // 2 averages the pixels from
+                # length / 2 left to length / 2 - 1 right, which moves the image half a pixel right
+                truth = (truth[0] + 0.5, truth[1], truth[2])
+
+        # Lighting: overall gain and a horizontal gradient centred on the frame
+        gradient = self.uniform(self.gradient_range) * self.rng.choice((-1, 1))
+        ramp = 1 + gradient * (np.arange(self.width, dtype=np.float32) / self.width - 0.5)
+        image *= (self.uniform(self.brightness_range) * ramp)[None, :, None]
+
+        # Sensor noise
+        sigma = self.uniform(self.noise_range)
+        if sigma > 0:
+            image += self.rng.normal(0, sigma, image.shape).astype(np.float32)
+
+        return np.clip(image, 0, 255).astype(np.uint8), truth
+
+    def generate_set(self, count):
+        """
+        Returns:
+            tuple: (frames, truths) lists of length count.
+        """
+        frames, truths = [], []
+        for _ in range(count):
+            frame, truth = self.generate()
+            frames.append(frame)
+            truths.append(truth)
+        return frames, truths
+
+class SyntheticSource(ImageSource):
+    """
+    Frame source replaying generated frames, with their ground truth in the same order.
+    """
+
+    def __init__(self, generator, count, loop=False):
+        frames, self.truths = generator.generate_set(count)
+        super().__init__([], loop, images=frames)
@@ -0,0 +1,254 @@
+import time
+
+import numpy as np
+
+from wave_cache import CBS_PER_PULSE, MAX_WAVES
+
+# Limits of the pigpio daemon with its default buffer settings
+MAX_PULSES = 12000
+MAX_CBS = 25016
+MAX_MICROS = 30 * 60 * 1000000
+
+class SimulatedPigpioError(Exception):
+    """
+    Raised where the pigpio daemon would fail a call, with the same message as pigpio.error.
+    """
+
+class Transmission:
+    """
+    Pulses played by one wave_chain(), wave_send_once() or wave_send_repeat() call.
+    """
+
+    def __init__(self, start, delays, gpio_on, gpio_off, repeat=False):
+        """
+        Args:
+            start (float): time.monotonic() when playback started.
+            delays (ndarray): Microseconds from each pulse to the next.
+            gpio_on (ndarray): Bits of the GPIO switched on by each pulse.
+            gpio_off (ndarray): Bits of the GPIO switched off by each pulse.
+            repeat (bool): The pulses repeat until wave_tx_stop().
+        """
+        self.start = start
+        self.delays = delays
+        self.gpio_on = gpio_on
+        self.gpio_off = gpio_off
+        self.repeat = repeat
+        self.times = np.concatenate(([0], np.cumsum(delays[:-1]))) if len(delays) else np.empty(0, np.int64)
+        self.duration = int(delays.sum()) / 1e6  # One cycle for a repeating transmission
+        self.end = None  # time.monotonic() when stopped early
+
+    def is_busy(self, timestamp):
+        if self.end is not None:
+            return False
+        return self.repeat or timestamp < self.start + self.duration
+
+    def rising_edges(self, gpio):
+        """
+        Returns:
+            ndarray: Seconds from the start of playback at which the GPIO was switched on, up to the stop time.
+                A repeating transmission reports its first cycle.
+        """
+        times = self.times[(self.gpio_on >> gpio) & 1 == 1] / 1e6
+        if self.end is not None:
+            times = times[times < self.end - self.start]
+        return times
+
+class SimulatedPi:
+    """
+    Stand-in for a pigpio.pi connection, for developing and benchmarking motion code away from the robot.
+
+    Implements the GPIO and waveform calls the firmware uses. Waves are allocated like the daemon does:
+    memory is taken from the top, a deleted wave's memory is reused only by a wave of exactly the same size
+    or once every wave above it is deleted too, and creation fails at the wave, pulse and control block
+    limits. Every playback is kept as a Transmission so the emitted step timing can be verified. With
+    realtime=True, wave_tx_busy() stays true for as long as the real waveform would play; otherwise playback
+    finishes as soon as it starts.
+    """
+
+    def __init__(self, realtime=True, max_pulses=MAX_PULSES, max_cbs=MAX_CBS):
+        self.connected = True
+        self.realtime = realtime
+        self.max_pulses = max_pulses
+        self.max_cbs = max_cbs
+        self.modes = {}
+        self.levels = {}
+        self.writes = []  # (time.monotonic(), gpio, level) for every write() and gpio_trigger() edge
+        self.pending = []  # Pulses added since the last wave_create()
+        self.waves = {}  # Live wave id to (delays, gpio_on, gpio_off) arrays
+        self.sizes = []  # Pulses of every allocated wave id, live or deleted
+        self.deleted = []  # Whether each allocated wave id has been deleted
+        self.transmissions = []
+        self.calls = 0  # Calls that would each be a round trip to the daemon
+
+    def call(self):
+        if not self.connected:
+            raise SimulatedPigpioError("not connected to the pigpio daemon")
+        self.calls += 1
+
+    # GPIO
+
+    def set_mode(self, gpio, mode):
+        self.call()
+        self.modes[gpio] = mode
+
+    def set_pull_up_down(self, gpio, pud):
+        self.call()
+
+    def read(self, gpio):
+        self.call()
+        return self.levels.get(gpio, 0)
+
+    def write(self, gpio, level):
+        self.call()
+        self.levels[gpio] = level
+        self.writes.append((time.monotonic(), gpio, level))
+
+    def gpio_trigger(self, gpio, pulse_len=10, level=1):
+        self.call()
+        now = time.monotonic()
+        self.writes.append((now, gpio, level))
+        self.writes.append((now + pulse_len / 1e6, gpio, 1 - level))
+
+    def stop(self):
+        self.connected = False
+
+    # Waveforms
+
+    def wave_clear(self):
+        self.call()
+        self.pending = []
+        self.waves = {}
+        self.sizes = []
+        self.deleted = []
+
+    def wave_add_new(self):
+        self.call()
+        self.pending = []
+
+    def wave_add_generic(self, pulses):
+        self.call()
+        self.pending.extend((p.gpio_on, p.gpio_off, p.delay) for p in pulses)
+        if len(self.pending) > self.max_pulses:
+            raise SimulatedPigpioError("'too many pulses'")
+        return len(self.pending)
+
+    def pulses_in_use(self):
+        """
+        Returns:
+            int: Pulses of memory allocated up to the top wave, including holes left by deleted waves.
+        """
+        return sum(self.sizes)
+
+    def wave_create(self):
+        self.call()
+        pulses = len(self.pending)
+        wave_id = next((i for i, size in enumerate(self.sizes) if self.deleted[i] and size == pulses), None)
+        if wave_id is None:
+            # No hole of exactly this size, so allocate above the top wave
+            if len(self.sizes) >= MAX_WAVES:
+                raise SimulatedPigpioError("'No more waveform ids'")
+            if self.pulses_in_use() + pulses > self.max_pulses:
+                raise SimulatedPigpioError("'too many pulses'")
+            if CBS_PER_PULSE * (self.pulses_in_use() + pulses) > self.max_cbs:
+                raise SimulatedPigpioError("'No more CBs for waveform'")
+            wave_id = len(self.sizes)
+            self.sizes.append(pulses)
+            self.deleted.append(False)
+        self.deleted[wave_id] = False
+        data = np.array(self.pending, np.int64).reshape(-1, 3)
+        self.waves[wave_id] = (data[:, 2], data[:, 0], data[:, 1])
+        self.pending = []
+        return wave_id
+
+    def wave_delete(self, wave_id):
+        self.call()
+        if wave_id not in self.waves:
+            raise SimulatedPigpioError("'waveform id not found'")
+        del self.waves[wave_id]
+        self.deleted[wave_id] = True
+        while self.deleted and self.deleted[-1]:  # Memory above the top live wave is freed
+            self.deleted.pop()
+            self.sizes.pop()
+
+    def wave_get_max_pulses(self):
+        self.call()
+        return self.max_pulses
+
+    def wave_get_max_cbs(self):
+        self.call()
+        return self.max_cbs
+
+    def wave_get_max_micros(self):
+        self.call()
+        return MAX_MICROS
+
+    def wave(self, wave_id):
+        if wave_id not in self.waves:
+            raise SimulatedPigpioError("'waveform id not found'")
+        return self.waves[wave_id]
+
+    def parse_chain(self, data, index=0, depth=0):
+        # Returns the pulses of the chain from index up to the matching loop end, and the index after it
+        parts = []
+        while index < len(data):
+            value = data[index]
+            if value != 255:
+                parts.append(self.wave(value))
+                index += 1
+            elif data[index + 1] == 0:  # Loop start
+                if depth >= 20:
+                    raise SimulatedPigpioError("'chain loops nested too deeply'")
+                loop, index = self.parse_chain(data, index + 2, depth + 1)
+                if index + 3 >= len(data) or data[index] != 255 or data[index + 1] != 1:
+                    raise SimulatedPigpioError("'chain loop not closed'")
+                count = data[index + 2] + 256 * data[index + 3]
+                parts.append(tuple(np.tile(array, count) for array in loop))
+                index += 4
+            elif data[index + 1] == 1:  # Loop end, handled by the caller
+                if depth == 0:
+                    raise SimulatedPigpioError("'chain loop end without start'")
+                break
+            elif data[index + 1] == 2:  # Delay
+                delay = data[index + 2] + 256 * data[index + 3]
+                parts.append((np.array([delay]), np.array([0]), np.array([0])))
+                index += 4
+            else:
+                raise SimulatedPigpioError("'bad chain command'")  # Loop forever is not simulated
+        if not parts:
+            empty = np.empty(0, np.int64)
+            return (empty, empty, empty), index
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts)), index
+
+    def transmit(self, delays, gpio_on, gpio_off, repeat=False):
+        if self.wave_tx_busy():
+            self.wave_tx_stop()
+        transmission = Transmission(time.monotonic(), delays, gpio_on, gpio_off, repeat)
+        if not self.realtime and not repeat:
+            transmission.end = transmission.start + transmission.duration
+        self.transmissions.append(transmission)
+
+    def wave_chain(self, data):
+        self.call()
+        if len(data) > 600:
+            raise SimulatedPigpioError("'chain is too long'")
+        (delays, gpio_on, gpio_off), _ = self.parse_chain(list(data))
+        self.transmit(delays, gpio_on, gpio_off)
+
+    def wave_send_once(self, wave_id):
+        self.call()
+        self.transmit(*self.wave(wave_id))
+
+    def wave_send_repeat(self, wave_id):
+        self.call()
+        self.transmit(*self.wave(wave_id), repeat=True)
+
+    def wave_tx_busy(self):
+        self.call()
+        if not self.transmissions:
+            return 0
+        return int(self.transmissions[-1].is_busy(time.monotonic()))
+
+    def wave_tx_stop(self):
+        self.call()
+        if self.transmissions and self.transmissions[-1].is_busy(time.monotonic()):
+            self.transmissions[-1].end = time.monotonic()
@@ -0,0 +1,544 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from motion_planner import plan_move
+from wave_cache import MAX_WAVES, WaveCache
+
+PROFILES = ("s-curve", "trapezoid")
+
+# pigpio.wave_add_generic() only reads these three attributes, so pigpio.pulse is not needed to build waves
+Pulse = namedtuple("Pulse", ("gpio_on", "gpio_off", "delay"))
+
+MAX_CHAIN_LENGTH = 600  # Bytes pigpio accepts in one wave_chain() call
+MAX_LOOP_COUNT = 65535  # Largest repeat count of one chain loop
+
+def profile_speeds(total_steps, max_speed, accel_steps, profile="s-curve", min_speed=1):
+    """
+    Speed of every step of a move, the same profiles move_motor computed step by step.
+
+    The ramps are indexed from both ends of the move, so the first step runs at the speed of the last
+    instead of at zero.
+
+    Args:
+        total_steps (int): Steps in the move.
+        max_speed (float): Cruise speed in steps per second.
+        accel_steps (int): Steps over which to accelerate and decelerate.
+        profile (str): "s-curve" for a raised cosine ramp, "trapezoid" for a linear ramp.
+        min_speed (float): Lowest speed of any step, the slowest steps of a long ramp are clamped to it.
+
+    Returns:
+        ndarray: Speeds in steps per second.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown motion profile {profile!r}, expected one of {', '.join(PROFILES)}")
+    accel_steps = min(accel_steps, total_steps // 2)
+    if accel_steps == 0:
+        return np.full(total_steps, max(float(max_speed), min_speed))
+
+    steps = np.arange(total_steps)
+    progress = np.minimum(np.minimum(steps + 1, total_steps - steps) / accel_steps, 1.0)
+    if profile == "s-curve":
+        factor = (1 - np.cos(np.pi * progress)) / 2
+    else:
+        factor = progress
+    return np.maximum(max_speed * factor, min_speed)
+
+def step_periods(speeds):
+    """
+    Returns:
+        ndarray: Whole-microsecond step periods for the speeds, the resolution pigpio waves are timed in.
+    """
+    return np.maximum(np.round(1e6 / np.asarray(speeds, float)), 2).astype(np.int64)
+
+def quantise_periods(periods, max_error):
+    """
+    Replaces a step period profile with as few constant-period levels as keep every step within max_error
+    of its planned time, so a ramp plays as a handful of looped one-step waves instead of a wave per step.
+
+    Levels are chosen greedily from the start of the move, each as long as any whole-microsecond period can
+    keep the steps it covers within the error, given the error carried in from the levels before it. The
+    period chosen is the one that leaves the least error for the next level.
+
+    Args:
+        periods (ndarray): Planned step periods in microseconds.
+        max_error (float): Largest difference in microseconds allowed between the quantised and planned
+            time of any step. 0 returns the periods unchanged.
+
+    Returns:
+        ndarray: Quantised step periods, one per step.
+    """
+    periods = np.asarray(periods, np.int64)
+    if max_error < 0:
+        raise ValueError(f"max_error must be at least 0, got {max_error}")
+    if max_error == 0 or not len(periods):
+        return periods.copy()
+
+    ends = np.cumsum(periods)  # Planned end of every step
+    quantised = np.empty_like(periods)
+    start = 0
+    offset = 0  # Quantised minus planned time at the start of the level
+    window = 64
+    while start < len(periods):
+        span = ends[start:start + window] - (ends[start - 1] if start else 0)
+        count = np.arange(1, len(span) + 1)
+        # Every step of the level bounds its period, a level can run while the bounds still overlap
+        low = np.maximum.accumulate(np.ceil((span - max_error - offset) / count))
+        high = np.minimum.accumulate(np.floor((span + max_error - offset) / count))
+        infeasible = low > high
+        if not infeasible.any() and start + window < len(periods):
+            window *= 4  # The level may run on past the window
+            continue
+        length = int(np.argmax(infeasible)) if infeasible.any() else len(span)
+        period = int(np.clip(round((span[length - 1] - offset) / length), low[length - 1], high[length - 1]))
+        quantised[start:start + length] = period
+        offset += length * period - int(span[length - 1])
+        start += length
+        window = 64
+    return quantised
+
+def period_levels(periods):
+    """
+    Returns:
+        list: (period, steps) for each run of equal periods, the [frequency, steps] levels of the old
+        generate_ramp() prototype in period form.
+    """
+    periods = np.asarray(periods)
+    if not len(periods):
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(periods)) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(periods)])))
+    return [(int(periods[start]), int(length)) for start, length in zip(starts, lengths)]
+
+def chain_segments(periods, min_loop=16):
+    """
+    Splits a move into runs of equal periods long enough to loop and stretches played out pulse by pulse.
+
+    Args:
+        periods (ndarray): Step periods in microseconds.
+        min_loop (int): Shortest run of equal periods worth a chain loop.
+
+    Returns:
+        list: ("pack", periods) and ("loop", period, count) segments in move order.
+    """
+    periods = np.asarray(periods)
+    segments = []
+    pack_start = None
+    start = 0
+    for period, length in period_levels(periods):
+        if length >= min_loop:
+            if pack_start is not None:
+                segments.append(("pack", periods[pack_start:start]))
+                pack_start = None
+            segments.append(("loop", period, length))
+        elif pack_start is None:
+            pack_start = start
+        start += length
+    if pack_start is not None:
+        segments.append(("pack", periods[pack_start:]))
+    return segments
+
+def loop_entry(wave_id, count):
+    """
+    Returns:
+        list: Chain bytes that play a wave count times, in as few loops as the loop counter allows.
+    """
+    entry = []
+    while count > 0:
+        repeat = min(count, MAX_LOOP_COUNT)
+        entry += [255, 0, wave_id, 255, 1, repeat & 0xFF, repeat >> 8] if repeat > 1 else [wave_id]
+        count -= repeat
+    return entry
+
+def chain_cost(segments, max_pack):
+    """
+    Returns:
+        tuple: (chain bytes, waves, pulses) needed to play the segments, with packs split into waves of at
+        most max_pack steps.
+    """
+    length = waves = pulses = 0
+    loop_periods = set()
+    for segment in segments:
+        if segment[0] == "loop":
+            length += len(loop_entry(0, segment[2]))
+            loop_periods.add(segment[1])
+        else:
+            pack_waves = -(-len(segment[1]) // max_pack)
+            length += pack_waves
+            waves += pack_waves
+            pulses += 2 * len(segment[1])
+    return length, waves + len(loop_periods), pulses + 2 * len(loop_periods)
+
+def loop_threshold(levels, min_loop, max_pack, max_pulses, max_waves):
+    """
+    Picks the shortest level worth a chain loop, nearest to min_loop, for which the chain fits in one
+    wave_chain() call and the waves in the pulse and wave budgets. Looping more levels costs chain bytes
+    and saves pulses, so the threshold is lowered when the pulses do not fit and raised when the chain
+    does not.
+
+    Args:
+        levels (list): (period, steps) levels from period_levels().
+
+    Returns:
+        int: Threshold for chain_segments(), or None if no threshold fits.
+    """
+    if not levels:
+        return min_loop
+    periods, lengths = np.array(levels, np.int64).T
+
+    def fits(threshold):
+        looped = lengths >= threshold
+        group = np.cumsum(looped)  # Consecutive packed levels share a group, and so a pack
+        packed = np.bincount(group[~looped], weights=lengths[~looped]).astype(np.int64)
+        packed = packed[packed > 0]
+        pack_waves = int((-(-packed // max_pack)).sum())
+        loop_periods = len(np.unique(periods[looped]))
+        length = 7 * int((-(-lengths[looped] // MAX_LOOP_COUNT)).sum()) + pack_waves
+        return (length <= MAX_CHAIN_LENGTH and loop_periods + pack_waves <= max_waves
+                and 2 * (int(packed.sum()) + loop_periods) <= max_pulses)
+
+    candidates = np.unique(np.concatenate(([min_loop], lengths, [lengths.max() + 1])))
+    candidates = candidates[candidates >= 2]
+    for threshold in sorted(candidates, key=lambda threshold: abs(np.log(threshold / min_loop))):
+        if fits(threshold):
+            return int(threshold)
+    return None
+
+def compile_periods(periods, max_error=0, min_loop=16, max_pack=3000, max_pulses=6000, max_waves=125):
+    """
+    Quantises a move and splits it into chain segments, raising the timing error only as far as needed for
+    the chain to fit in one wave_chain() call and its waves in the budgets.
+
+    Args:
+        periods (ndarray): Planned step periods in microseconds.
+        max_error (float): Timing error allowed for each step in microseconds, see quantise_periods().
+        min_loop (int): Preferred shortest run of equal periods played as a chain loop.
+        max_pack (int): Most steps packed into one wave.
+        max_pulses (int): Pulses the move's waves may use.
+        max_waves (int): Wave ids the move may use.
+
+    Returns:
+        tuple: (quantised periods, segments, timing error used).
+
+    Raises:
+        ValueError: If the move does not fit with any timing error.
+    """
+    periods = np.asarray(periods, np.int64)
+
+    def attempt(error):
+        quantised = quantise_periods(periods, error)
+        return quantised, loop_threshold(period_levels(quantised), min_loop, max_pack, max_pulses, max_waves)
+
+    quantised, threshold = attempt(max_error)
+    if threshold is not None:
+        return quantised, chain_segments(quantised, threshold), max_error
+
+    # Double the error until the move fits, then bisect back towards the smallest error that does
+    duration = int(periods.sum())
+    low, high = max_error, max(1, 2 * max_error)
+    while True:
+        quantised, threshold = attempt(high)
+        if threshold is not None:
+            break
+        if high >= duration:
+            raise ValueError(f"Move of {len(periods)} steps does not fit in a {MAX_CHAIN_LENGTH} byte wave chain")
+        low, high = high, 2 * high
+    best = (quantised, threshold, high)
+    while high - low > max(1, high // 16):
+        error = (low + high) // 2
+        quantised, threshold = attempt(error)
+        if threshold is None:
+            low = error
+        else:
+            high = error
+            best = (quantised, threshold, error)
+    quantised, threshold, error = best
+    return quantised, chain_segments(quantised, threshold), error
+
+def chain_report(planned, quantised, segments, max_pack=3000):
+    """
+    Returns:
+        dict: Levels, chain loops and packs, chain bytes, waves and pulses the move needs, and the mean and
+        largest difference in microseconds between the quantised and planned step times.
+    """
+    length, waves, pulses = chain_cost(segments, max_pack)
+    packs = sum(segment[0] == "pack" for segment in segments)
+    deviation = np.abs(np.cumsum(quantised) - np.cumsum(planned)) if len(planned) else np.zeros(1)
+    return {"levels": len(period_levels(quantised)), "loops": len(segments) - packs, "packs": packs,
+            "chain_bytes": length, "waves": waves, "pulses": pulses,
+            "mean_deviation_us": float(deviation.mean()), "max_deviation_us": float(deviation.max())}
+
+class WaveMove:
+    """
+    A move being played back by pigpio. The step times are exact, as the DMA engine issues every pulse at
+    its scheduled offset from the start of the chain.
+    """
+
+    def __init__(self, direction, periods, wave_ids, start):
+        """
+        Args:
+            direction (int): 1 for forward, 0 for backward.
+            periods (ndarray): Step periods in microseconds.
+            wave_ids (list): Waves the chain plays, held in the stepper's WaveCache.
+            start (float): time.monotonic() when the chain was started.
+        """
+        self.direction = direction
+        self.periods = periods
+        self.wave_ids = wave_ids
+        self.start = start
+        self.end = None  # time.monotonic() when the move was stopped early
+        # Rising edge of each step, in seconds from the start
+        self.step_times = np.concatenate(([0], np.cumsum(periods[:-1]))) / 1e6 if len(periods) else np.empty(0)
+        self.duration = periods.sum() / 1e6
+
+    @property
+    def total_steps(self):
+        return len(self.periods)
+
+    def steps_done(self, timestamp=None):
+        """
+        Returns:
+            int: Steps issued by the timestamp, now by default.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if self.end is not None:
+            timestamp = min(timestamp, self.end)
+        return int(np.searchsorted(self.step_times, timestamp - self.start, side="right"))
+
+    def speed_at(self, timestamp=None):
+        """
+        Returns:
+            float: Speed in steps per second at the timestamp, now by default, 0 before or after the move.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        elapsed = timestamp - self.start
+        if elapsed < 0 or elapsed >= self.duration or (self.end is not None and timestamp >= self.end):
+            return 0.0
+        return 1e6 / self.periods[self.steps_done(timestamp) - 1]
+
+class WaveStepper:
+    """
+    Stepper driver that plays moves from pigpio wave chains instead of toggling the STEP pin in Python.
+
+    Each move is planned as a step period array, quantised into constant-period levels within max_error of
+    the planned step times, and compiled into a compact chain: levels long enough loop a one-step wave, and
+    everything else is packed pulse by pulse into as few waves as pigpio allows. pigpio's DMA engine then
+    times every step, so the speed is no longer capped by socket round trips and sleeps and the timing does
+    not jitter.
+
+    Waves stay in a WaveCache between moves. They are keyed by their contents, so a ramp is shared by every
+    move with the same speed profile whatever its length or direction, and repeated moves create no waves.
+
+    Works with a pigpio.pi connection or a SimulatedPi from simulated_pigpio.py.
+    """
+
+    def __init__(self, pi, step_pin, dir_pin, min_loop=16, poll=0.005, cache=None, max_error=20):
+        """
+        Args:
+            pi: Connected pigpio.pi, or a SimulatedPi.
+            step_pin (int): GPIO of the driver's STEP input.
+            dir_pin (int): GPIO of the driver's DIR input.
+            min_loop (int): Preferred shortest run of equal periods played as a chain loop.
+            poll (float): Seconds between progress checks while waiting for a move.
+            cache (WaveCache): Cache holding the waves, a new one for the connection by default.
+            max_error (float): Microseconds any step may be off its planned time so ramps can be quantised
+                into looped levels, 0 to play the periods exactly unless the chain would not fit.
+        """
+        self.pi = pi
+        self.step_pin = step_pin
+        self.dir_pin = dir_pin
+        self.min_loop = min_loop
+        self.poll = poll
+        self.cache = cache if cache is not None else WaveCache(pi)
+        self.max_error = max_error
+        self.max_pack = max(1, self.cache.max_pulses // 4)  # Two pulses a step, at most half the pulse memory a wave
+        self.current = None
+
+    def compile(self, periods):
+        """
+        Returns:
+            tuple: (quantised periods, chain segments) the stepper would play for the planned periods.
+        """
+        # Each move may use half the daemon's waves, leaving the rest of the cache for the ramps of others
+        quantised, segments, _ = compile_periods(periods, self.max_error, self.min_loop, self.max_pack,
+                                                 self.cache.max_pulses // 2, MAX_WAVES // 2)
+        return quantised, segments
+
+    def build(self, segments):
+        """
+        Looks up or creates the waves for a move and builds the chain that plays them.
+
+        Args:
+            segments (list): Chain segments from compile().
+
+        Returns:
+            tuple: (chain bytes, list of wave ids).
+        """
+        try:
+            return self.build_chain(segments)
+        except RuntimeError:
+            # The move's own first waves can sit above holes that leave no room for the rest, start afresh
+            self.cache.clear()
+            return self.build_chain(segments)
+
+    def build_chain(self, segments):
+        chain = []
+        wave_ids = []
+        for segment in segments:
+            if segment[0] == "loop":
+                _, period, count = segment
+                wave_id = self.wave(("step", self.step_pin, period), [period], wave_ids)
+                chain += loop_entry(wave_id, count)
+            else:
+                pack = segment[1]
+                for start in range(0, len(pack), self.max_pack):
+                    part = pack[start:start + self.max_pack]
+                    wave_id = self.wave(("pack", self.step_pin, part.tobytes()), part, wave_ids)
+                    chain.append(wave_id)
+        return chain, wave_ids
+
+    def wave(self, key, periods, wave_ids):
+        # Adds the wave to wave_ids, which also keeps the cache from evicting it for a later part of the chain
+        wave_id = self.cache.get(key, lambda: self.step_pulses(periods), keep=wave_ids)
+        if wave_id not in wave_ids:
+            wave_ids.append(wave_id)
+        return wave_id
+
+    def step_pulses(self, periods):
+        # STEP is high for the first half of each period, as move_motor drove it
+        step_bit = 1 << self.step_pin
+        pulses = []
+        for period in periods:
+            high = int(period) // 2
+            pulses.append(Pulse(step_bit, 0, high))
+            pulses.append(Pulse(0, step_bit, int(period) - high))
+        return pulses
+
+    def start(self, direction, periods):
+        """
+        Starts playing a move and returns straight away.
+
+        Args:
+            direction (int): 1 for forward, 0 for backward.
+            periods (ndarray): Step periods in microseconds, e.g. step_periods(profile_speeds(...)). They are
+                quantised within the stepper's max_error.
+
+        Returns:
+            WaveMove: The move with its quantised periods, for progress queries and wait().
+        """
+        return self.play(direction, self.prepare(periods))
+
+    def prepare(self, periods):
+        """
+        Compiles a move and creates its waves without playing it, which can be done while another move
+        plays so the next one starts with only two daemon calls.
+
+        Args:
+            periods (ndarray): Step periods in microseconds.
+
+        Returns:
+            tuple: (quantised periods, chain bytes, wave ids) for play().
+        """
+        periods, segments = self.compile(periods)
+        chain, wave_ids = self.build(segments)
+        return periods, chain, wave_ids
+
+    def play(self, direction, prepared):
+        """
+        Starts playing a move from prepare() and returns straight away.
+
+        Args:
+            direction (int): 1 for forward, 0 for backward.
+            prepared (tuple): Return value of prepare(), for a move prepared since the last one started.
+
+        Returns:
+            WaveMove: The move, for progress queries and wait().
+        """
+        if self.is_busy():
+            raise RuntimeError("A move is already running")
+        if self.current is not None:
+            self.finish()
+        periods, chain, wave_ids = prepared
+        self.cache.set_playing(wave_ids)
+        self.pi.write(self.dir_pin, direction)
+        self.pi.wave_chain(chain)
+        self.current = WaveMove(direction, periods, wave_ids, time.monotonic())
+        return self.current
+
+    def move(self, direction, total_steps, max_speed=500, accel_steps=100, profile="s-curve", callback=None):
+        """
+        Moves with the same arguments as move_motor, blocking until the last step.
+
+        Args:
+            direction (int): Direction to move (1 for forward, 0 for backward).
+            total_steps (int): Total number of steps to move.
+            max_speed (float): Maximum speed in steps per second.
+            accel_steps (int): Steps over which to accelerate and decelerate.
+            profile (str): One of PROFILES.
+            callback (callable): Called with the WaveMove every poll interval and once at the end.
+
+        Returns:
+            WaveMove: The finished move.
+        """
+        if total_steps <= 0:
+            return None
+        move = self.start(direction, step_periods(profile_speeds(total_steps, max_speed, accel_steps, profile)))
+        self.wait(move, callback)
+        return move
+
+    def travel(self, direction, distance, max_speed, max_accel, max_jerk=None, profile="jerk-limited",
+               callback=None):
+        """
+        Moves the fastest way the limits allow, planned by motion_planner, blocking until the last step.
+
+        Args:
+            direction (int): Direction to move (1 for forward, 0 for backward).
+            distance (int): Steps to move.
+            max_speed (float): Speed limit in steps per second.
+            max_accel (float): Acceleration limit in steps per second squared.
+            max_jerk (float): Jerk limit in steps per second cubed, needed by the jerk-limited profile.
+            profile (str): One of motion_planner.PLAN_PROFILES.
+            callback (callable): Called with the WaveMove every poll interval and once at the end.
+
+        Returns:
+            WaveMove: The finished move.
+        """
+        if distance <= 0:
+            return None
+        move = self.start(direction, plan_move(distance, max_speed, max_accel, max_jerk, profile).periods())
+        self.wait(move, callback)
+        return move
+
+    def is_busy(self):
+        return bool(self.pi.wave_tx_busy())
+
+    def wait(self, move, callback=None):
+        """
+        Blocks until a move has played.
+
+        Args:
+            move (WaveMove): Move returned by start().
+            callback (callable): Called with the move every poll interval and once at the end.
+        """
+        while self.is_busy():
+            if callback is not None:
+                callback(move)
+            time.sleep(self.poll)
+        if callback is not None:
+            callback(move)
+        if move is self.current:
+            self.finish()
+
+    def stop(self):
+        """
+        Stops the running move straight away, without a ramp down.
+        """
+        self.pi.wave_tx_stop()
+        if self.current is not None:
+            self.current.end = time.monotonic()
+            self.finish()
+
+    def finish(self):
+        self.cache.set_playing(())  # The move's waves stay cached for the next one
+        self.current = None
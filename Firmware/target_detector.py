@@ -1,13 +1,140 @@
 import cv2
 import numpy as np
+import threading
+import time
+from collections import deque
+
+from color_lut import ColorLUT
+from frame_buffers import FrameRing, ScratchBuffers
+from detector_stats import StageTimer
+from frame_grabber import FrameGrabber
+from detector_engines import contour_measurements, create_engine
+from debug_view import DebugView
+from detector_events import DetectorEvents
+from hsv_calibration import DEFAULT_CALIBRATION_PATH, calibrate_hsv, load_calibration, save_calibration
+
+class DetectionResult:
+    """
+    Immutable snapshot published for every processed frame.
+
+    All fields describe the same frame, and a published result is never modified, so a reader holding one
+    can use its fields together without a lock. x_displacement, centroid, area and circularity are None when
+    no target is seen. circularity is also None for engines that do not measure it, e.g. "hough".
+    """
+
+    __slots__ = ("frame_id", "timestamp", "latency", "x_displacement", "centroid", "area", "circularity",
+                 "crossing_time")
+
+    def __init__(self, frame_id, timestamp, latency, x_displacement=None, centroid=None, area=None,
+                 circularity=None, crossing_time=None):
+        """
+        Args:
+            frame_id (int): Sequence number of the frame, counting from 1.
+            timestamp (float): time.monotonic() at the frame's exposure midpoint, the capture time less the
+                detector's frame_delay.
+            latency (float): Seconds from capture to publication.
+            x_displacement (int): Target centre minus frame centre in pixels, positive to the right.
+            centroid (tuple): Sub-pixel (center_x, center_y) of the target.
+            area (float): Target area in pixels as the engine measures it, e.g. the contour engine includes
+                the inner rings and the components engine counts only blue pixels.
+            circularity (float): Target circularity, 1 for a perfect circle.
+            crossing_time (float): time.monotonic() at which the target centre crosses the frame centre, only
+                while the image is moving.
+        """
+        for name, value in zip(self.__slots__, (frame_id, timestamp, latency, x_displacement, centroid, area,
+                                                circularity, crossing_time)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DetectionResult is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("DetectionResult is immutable")
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"DetectionResult({fields})"
+
+    @property
+    def has_target(self):
+        return self.centroid is not None
 
 class TargetDetector:
-    def __init__(self, camera_index=0, desired_width=720, desired_height=720, debug_mode=False):
-        self.cap = self.initialize_camera(camera_index, desired_width, desired_height)
+    def __init__(self, camera_index=0, desired_width=720, desired_height=720, debug_mode=False, fps_window=30,
+                 tracking=False, roi_scale=2.0, roi_min_size=64, roi_motion_gain=2.0, roi_motion_scale=1.5,
+                 pyramid_scale=1, pyramid_candidates=3, color_lut=None, target_class="blue",
+                 ring_size=3, engine="contours", threaded_capture=False,
+                 instrument=False, stats_window=300, source=None, workers=0, parallel_mode="frames",
+                 centre_tolerance=1, exposure_time=0.01, frame_delay=0.0, line_time=0.0, debug_output="window",
+                 debug_path=None, debug_fps=10, read_retries=10, retry_delay=0.05):
+        # source replaces the camera with a frame source from frame_source.py, e.g. for offline replay.
+        # camera_index=None creates a detector without a camera, for processing frames passed to process_frame()
+        if source is not None:
+            self.cap = source
+        elif camera_index is not None:
+            self.cap = self.initialize_camera(camera_index, desired_width, desired_height)
+        else:
+            self.cap = None
         self.debug_mode = debug_mode
-        self.x_displacement = 0
-        self.blue_hsv_lower = np.array([110, 50, 50])
+        # Overlays go to a window, numbered images or an MJPEG file, see debug_view.py
+        self.debug_view = DebugView(debug_output, debug_path, debug_fps) if debug_mode else None
+        self.blue_hsv_lower = np.array([110, 50, 50])  # Defaults until calibrate() loads or measures bounds
         self.blue_hsv_upper = np.array([130, 255, 255])
+        self.color_lut = color_lut  # Optional ColorLUT replacing cvtColor + inRange
+        self.target_class = target_class  # Class of the color_lut that marks the target
+        self.min_area = 100  # Smallest target area in full-resolution pixels
+        self.min_circularity = 0.7
+        self.engine_name = engine  # Registered engine from detector_engines.py, e.g. "contours" or "hough"
+        self.engine = create_engine(engine, self)
+
+        # Streaming state. latest_result is replaced with one reference assignment, so readers need no lock.
+        self.is_running = False
+        self.detection_thread = None
+        self.error = None  # Exception that ended the detection thread, None while it runs or after stop()
+        self.read_retries = read_retries  # Consecutive failed reads retried before the thread gives up
+        self.retry_delay = retry_delay  # Seconds before the first retry, doubling for each one after it
+        self.frame_id = 0
+        self.latest_result = None
+        self.frame_times = deque(maxlen=fps_window)  # Capture timestamps used for the sustained FPS
+        self.latencies = deque(maxlen=fps_window)  # Capture-to-result latency of recent frames
+        self.timer = StageTimer(stats_window) if instrument else None  # Per-stage timing, None when disabled
+        self.events = DetectorEvents(centre_tolerance)  # Acquired, lost, centred and measurement notifications
+
+        # Multiprocess detection, see parallel_detector.py. 0 runs detection on the detector thread.
+        self.workers = workers
+        self.parallel_mode = parallel_mode
+
+        # Preallocated buffers, so steady-state capture and detection do not allocate image memory
+        self.frames = FrameRing(ring_size)
+        self.frame_shape = None
+        self.scratch = ScratchBuffers()
+
+        # Optional grab thread that always hands over the newest frame instead of the oldest queued one
+        self.grabber = FrameGrabber(self.cap) if threaded_capture and self.cap is not None else None
+
+        # Tracking ROI state
+        self.tracking = tracking
+        self.roi_scale = roi_scale  # Window size as a multiple of the target's bounding box
+        self.roi_min_size = roi_min_size  # Smallest window side in pixels
+        self.roi_motion_gain = roi_motion_gain  # Extra margin per pixel/frame of target motion
+        self.roi_motion_scale = roi_motion_scale  # Window growth while the robot is moving
+        self.in_motion = False
+        self.track_centroid = None
+        self.track_size = (0, 0)
+        self.track_velocity = (0, 0)
+        self.roi_hits = 0
+        self.roi_misses = 0
+        self.full_searches = 0
+
+        # Detection on the move, see set_image_velocity() and the "motion" engine
+        self.image_velocity = 0.0  # Target motion across the image in pixels per second, positive to the right
+        self.exposure_time = exposure_time  # Camera exposure in seconds, sets the blur length
+        self.frame_delay = frame_delay  # Seconds from the exposure midpoint to the capture timestamp
+        self.line_time = line_time  # Rolling shutter row readout time in seconds, 0 for a global shutter
+
+        # Coarse-to-fine search: 1 searches at full resolution, 4 or 8 searches a downscaled frame first
+        self.pyramid_scale = pyramid_scale
+        self.pyramid_candidates = pyramid_candidates  # Coarse blobs to refine, largest first
 
     def initialize_camera(self, camera_index, width, height):
         cap = cv2.VideoCapture(camera_index)
@@ -17,54 +144,513 @@ class TargetDetector:
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
         return cap
 
+    def calibrate(self, path=DEFAULT_CALIBRATION_PATH, frames=15, recalibrate=False, region=None):
+        """
+        Sets the HSV bounds from the calibration file, or measures them from the camera and saves them if
+        there is no valid file. Call before start() with the target in view. With a color_lut, its target class
+        is rebuilt from the new bounds, as the table would otherwise keep classifying with the old ones.
+
+        Args:
+            path (str): Calibration file.
+            frames (int): Frames to histogram when measuring.
+            recalibrate (bool): Measure even if the file exists.
+            region (tuple): Optional (x, y, w, h) known to contain the target.
+
+        Returns:
+            bool: True if the bounds were measured, False if they were loaded.
+        """
+        calibration = None if recalibrate else load_calibration(path)
+        if calibration is not None:
+            self.blue_hsv_lower, self.blue_hsv_upper = calibration
+            self.update_color_lut()
+            return False
+
+        samples = [self.capture()[0].copy() for _ in range(frames)]
+        self.blue_hsv_lower, self.blue_hsv_upper, pixels = calibrate_hsv(samples, region, self.min_area,
+                                                                         self.min_circularity)
+        save_calibration(self.blue_hsv_lower, self.blue_hsv_upper, path, pixels=pixels,
+                         resolution=[samples[0].shape[1], samples[0].shape[0]])
+        self.update_color_lut()
+        return True
+
+    def update_color_lut(self):
+        # Replaces the color_lut with one whose target class spans the HSV bounds, keeping its other classes
+        if self.color_lut is None:
+            return
+        bounds = (tuple(int(v) for v in self.blue_hsv_lower), tuple(int(v) for v in self.blue_hsv_upper))
+        if self.color_lut.color_ranges.get(self.target_class) == bounds:
+            return  # Already built from these bounds
+        ranges = dict(self.color_lut.color_ranges, **{self.target_class: bounds})
+        self.color_lut = ColorLUT(ranges, cache_path=self.color_lut.cache_path)
+
+    def start(self):
+        """
+        Starts the capture/process loop on a background thread.
+        """
+        if self.is_running:
+            return
+        if self.grabber is not None:
+            self.grabber.start()
+        self.is_running = True
+        self.error = None
+        self.events.set_error(None)
+        self.detection_thread = threading.Thread(target=self.run, daemon=True)
+        self.detection_thread.start()
+
+    def stop(self):
+        """
+        Stops the capture/process loop and waits for the thread to exit.
+        """
+        self.is_running = False
+        if self.detection_thread is not None and self.detection_thread is not threading.current_thread():
+            self.detection_thread.join()
+        self.detection_thread = None
+        if self.grabber is not None:
+            self.grabber.stop()
+
+    def run(self):
+        """
+        Processes frames continuously until stop() is called.
+
+        A failed read, e.g. a dropped camera frame or a grabber timeout, is retried after a back-off. Once
+        read_retries reads in a row have failed, or on any other error, the thread stops: is_running is
+        cleared, the exception is kept in error, and wait_for() raises in every waiting caller.
+        """
+        try:
+            if self.workers > 0:
+                self.run_parallel()
+                return
+            failures = 0
+            while self.is_running:
+                try:
+                    self.detect_targets()
+                    failures = 0
+                except IOError as error:
+                    failures = self.back_off(failures + 1, error)
+        except Exception as error:
+            self.error = error
+            self.is_running = False
+            self.events.set_error(error)
+
+    def back_off(self, failures, error):
+        """
+        Waits before retrying a failed read, or re-raises the read error once too many have failed in a row.
+
+        Returns:
+            int: The number of consecutive failures.
+        """
+        if failures > self.read_retries:
+            raise error
+        time.sleep(min(self.retry_delay * 2 ** (failures - 1), 1.0))
+        return failures
+
+    def run_parallel(self):
+        """
+        Captures frames on this thread while worker processes detect, publishing results in frame order.
+        """
+        from parallel_detector import ParallelDetector  # Imported here as it imports this module
+
+        pool = None
+        failures = 0
+        try:
+            while self.is_running:
+                try:
+                    frame, timestamp = self.capture()
+                    failures = 0
+                except IOError as error:
+                    failures = self.back_off(failures + 1, error)
+                    continue
+                if pool is None:
+                    pool = ParallelDetector(frame.shape, self.workers, self.parallel_mode,
+                                            attributes=self.worker_attributes(), **self.worker_kwargs())
+                pool.submit(frame, timestamp)
+                for done_timestamp, target in pool.collect():
+                    self.publish(done_timestamp, target, frame.shape[1])
+        finally:
+            if pool is not None:
+                pool.close()
+
+    def worker_kwargs(self):
+        """
+        Returns:
+            dict: Constructor arguments that reproduce this detector's detection settings in a worker.
+        """
+        return {"engine": self.engine_name, "exposure_time": self.exposure_time, "pyramid_scale": self.pyramid_scale,
+                "pyramid_candidates": self.pyramid_candidates, "color_lut": self.color_lut,
+                "target_class": self.target_class}
+
+    def worker_attributes(self):
+        """
+        Returns:
+            dict: Threshold attributes to copy onto a worker's detector.
+        """
+        return {"blue_hsv_lower": self.blue_hsv_lower, "blue_hsv_upper": self.blue_hsv_upper,
+                "min_area": self.min_area, "min_circularity": self.min_circularity}
+
     def detect_targets(self):
-        ret, frame = self.cap.read()
+        """
+        Captures and processes a single frame, then publishes the result.
+
+        Returns:
+            DetectionResult: The published result for this frame.
+        """
+        if self.timer is not None:
+            self.timer.begin_frame()
+        frame, timestamp = self.capture()
+        target = self.process_frame(frame)
+        result = self.publish(timestamp, target, frame.shape[1])
+        if self.timer is not None:
+            self.timer.end_frame()
+        return result
+
+    def capture(self):
+        """
+        Reads the next frame from the camera, grabber or frame source.
+
+        Returns:
+            tuple: (frame, timestamp) where timestamp is time.monotonic() at capture.
+        """
+        if self.grabber is not None:
+            self.grabber.start()
+            ret, frame, timestamp = self.grabber.read()
+        else:
+            if self.frame_shape is None:
+                ret, frame = self.cap.read()  # First frame sets the size of the ring buffers
+            else:
+                ret, frame = self.cap.read(self.frames.next(self.frame_shape))
+            timestamp = time.monotonic()
         if not ret:
             raise IOError("Cannot read from webcam")
+        self.frame_shape = frame.shape
+        if self.timer is not None:
+            self.timer.lap("capture")
+        return frame, timestamp
+
+    def process_frame(self, frame):
+        """
+        Finds the target in a BGR frame, searching only the tracking window when tracking is enabled.
+
+        Args:
+            frame (ndarray): BGR image.
+
+        Returns:
+            tuple: Same as find_target().
+        """
+        target = None
+        window = None
+        if self.tracking and self.track_centroid is not None:
+            window = self.tracking_window(frame.shape)
+            x0, y0, x1, y1 = window
+            target = self.find_target(frame[y0:y1, x0:x1], (x0, y0))
+            if target is not None and not self.touches_window_edge(target[2], window, frame.shape):
+                self.roi_hits += 1
+            else:
+                target = None  # Lost or clipped by the window, fall back to a full-frame search
+                self.roi_misses += 1
+
+        if target is None:
+            self.full_searches += 1
+            target = self.find_target_coarse(frame) if self.pyramid_scale > 1 else self.find_target(frame)
+
+        self.update_track(target)
+        if self.debug_view is not None:
+            # Only a rate-limited copy is made here, overlays are drawn on the view's own thread
+            self.debug_view.submit(frame, target, window)
+            if self.timer is not None:
+                self.timer.lap("draw")
+        return target
+
+    def segment(self, image):
+        """
+        Creates a mask of target-coloured pixels.
+
+        Args:
+            image (ndarray): BGR image or a view of part of one.
+
+        Returns:
+            ndarray: uint8 mask, non-zero on target-coloured pixels.
+        """
+        mask = self.scratch.get("mask", image.shape[:2])
+        if self.color_lut is not None:
+            self.color_lut.mask(image, self.target_class, dst=mask)
+            if self.timer is not None:
+                self.timer.lap("threshold")  # The lookup does conversion and threshold in one step
+            return mask
 
         # Convert the image to the HSV color space
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=self.scratch.get("hsv", image.shape))
+        if self.timer is not None:
+            self.timer.lap("convert")
+
         # Create a mask for the blue color using the predefined range
-        mask = cv2.inRange(hsv, self.blue_hsv_lower, self.blue_hsv_upper)
-
-        # Find contours in the mask
-        contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-        valid_contours = []
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            perimeter = cv2.arcLength(cnt, True)
-            if perimeter == 0:
-                continue  # Avoid division by zero
-            circularity = 4 * np.pi * (area / (perimeter * perimeter))
-            if area > 100 and circularity > 0.7:  # Adjust thresholds as needed
-                valid_contours.append(cnt)
-
-        if valid_contours:
-            # Find the largest contour, assumed to be the target
-            largest_contour = max(valid_contours, key=cv2.contourArea)
-            moments = cv2.moments(largest_contour)
-            if moments["m00"] != 0:
-                center_x = int(moments["m10"] / moments["m00"])
-                center_y = int(moments["m01"] / moments["m00"])
-                self.x_displacement = center_x - (frame.shape[1] // 2)
-
-                if self.debug_mode:
-                    # Draw the center of the target
-                    cv2.circle(frame, (center_x, center_y), 5, (0, 255, 0), -1)
-                    # Draw center line of the frame
-                    cv2.line(frame, (frame.shape[1] // 2, 0), (frame.shape[1] // 2, frame.shape[0]), (0, 0, 255), 2)
-                    # Show the frame with the detected target
-                    cv2.imshow('Target Detection', frame)
-                    cv2.waitKey(1)
+        cv2.inRange(hsv, self.blue_hsv_lower, self.blue_hsv_upper, dst=mask)
+        if self.timer is not None:
+            self.timer.lap("threshold")
+        return mask
+
+    def find_target(self, image, offset=(0, 0)):
+        """
+        Finds the largest circular blue blob in an image or image region.
+
+        Args:
+            image (ndarray): BGR image or a view of part of one.
+            offset (tuple): (x, y) position of the region within the full frame.
+
+        Returns:
+            tuple: (center_x, center_y, (x, y, w, h), area, circularity) in full-frame pixels, or None if no
+            valid target is found.
+        """
+        return self.find_target_mask(self.segment(image), offset)
+
+    def find_target_mask(self, mask, offset=(0, 0)):
+        """
+        Finds the target in an already segmented mask with the selected engine.
+
+        Args:
+            mask (ndarray): uint8 mask of target-coloured pixels.
+            offset (tuple): (x, y) position of the mask within the full frame.
+
+        Returns:
+            tuple: Same as find_target().
+        """
+        return self.engine.find_target(mask, offset)
+
+    def find_target_coarse(self, image):
+        """
+        Finds candidate blobs on a downscaled copy of the image, then refines each at full resolution
+        inside its bounding box until a valid target is found.
+
+        Args:
+            image (ndarray): BGR image.
+
+        Returns:
+            tuple: Same as find_target().
+        """
+        scale = self.pyramid_scale
+        height, width = image.shape[:2]
+        small = self.scratch.get("small", (height // scale, width // scale, 3))
+        cv2.resize(image, (width // scale, height // scale), dst=small, interpolation=cv2.INTER_NEAREST)
+        if self.timer is not None:
+            self.timer.lap("convert")
+
+        mask = self.segment(small)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if self.timer is not None:
+            self.timer.lap("contours")
+
+        # Circularity is unreliable at low resolution, so only area is used to pick candidates here
+        min_area = self.min_area / (scale * scale)
+        areas, _ = contour_measurements(contours)
+        candidates = np.flatnonzero(areas >= min_area)
+        candidates = candidates[np.argsort(areas[candidates])[::-1]]
+        if self.timer is not None:
+            self.timer.lap("filter")
+
+        for index in candidates[:self.pyramid_candidates]:
+            x, y, w, h = cv2.boundingRect(contours[index])
+            # Map back to full resolution with a one coarse pixel margin
+            x0 = max(0, (x - 1) * scale)
+            y0 = max(0, (y - 1) * scale)
+            x1 = min(width, (x + w + 1) * scale)
+            y1 = min(height, (y + h + 1) * scale)
+            target = self.find_target(image[y0:y1, x0:x1], (x0, y0))
+            if target is not None:
+                return target
+        return None
+
+    def tracking_window(self, frame_shape):
+        """
+        Computes the search window around the last known target, grown by its apparent motion.
+
+        Args:
+            frame_shape (tuple): Shape of the frame being processed.
+
+        Returns:
+            tuple: (x0, y0, x1, y1) window clipped to the frame.
+        """
+        height, width = frame_shape[:2]
+        center_x, center_y = self.track_centroid
+        velocity_x, velocity_y = self.track_velocity
+
+        # Half the target size scaled by the margin, plus room for the distance moved since the last frame
+        half_w = self.track_size[0] * self.roi_scale / 2 + abs(velocity_x) * self.roi_motion_gain
+        half_h = self.track_size[1] * self.roi_scale / 2 + abs(velocity_y) * self.roi_motion_gain
+        if self.in_motion:
+            half_w *= self.roi_motion_scale
+            half_h *= self.roi_motion_scale
+        half_w = max(half_w, self.roi_min_size / 2)
+        half_h = max(half_h, self.roi_min_size / 2)
+
+        # Centre the window on where the target is expected to be in this frame
+        predicted_x = center_x + velocity_x
+        predicted_y = center_y + velocity_y
+        x0 = max(0, int(predicted_x - half_w))
+        y0 = max(0, int(predicted_y - half_h))
+        x1 = min(width, int(predicted_x + half_w) + 1)
+        y1 = min(height, int(predicted_y + half_h) + 1)
+        return x0, y0, x1, y1
+
+    @staticmethod
+    def touches_window_edge(bounding_box, window, frame_shape):
+        """
+        Checks whether a target found in the window is clipped by an edge that is not also a frame edge.
+        """
+        x, y, w, h = bounding_box
+        x0, y0, x1, y1 = window
+        height, width = frame_shape[:2]
+        return ((x <= x0 and x0 > 0) or (y <= y0 and y0 > 0) or
+                (x + w >= x1 and x1 < width) or (y + h >= y1 and y1 < height))
+
+    def update_track(self, target):
+        """
+        Updates the tracking state from the latest detection.
+
+        Args:
+            target (tuple): Result of find_target(), or None if the target was lost.
+        """
+        if target is None:
+            self.track_centroid = None
+            self.track_velocity = (0, 0)
+            return
+
+        center_x, center_y, (_, _, w, h) = target[:3]
+        if self.track_centroid is not None:
+            self.track_velocity = (center_x - self.track_centroid[0], center_y - self.track_centroid[1])
+        self.track_centroid = (center_x, center_y)
+        self.track_size = (w, h)
+
+    def set_in_motion(self, in_motion):
+        """
+        Tells the tracker whether the robot is moving so the search window can be enlarged.
+
+        Args:
+            in_motion (bool): True while a move is in progress.
+        """
+        self.in_motion = in_motion
+
+    def set_image_velocity(self, velocity):
+        """
+        Tells the detector how fast the target is moving across the image, for the motion engine's blur model
+        and the crossing time and rolling shutter corrections in each result.
+
+        Args:
+            velocity (float): Pixels per second along x, positive to the right, 0 when stationary. Not
+                forwarded to parallel worker processes.
+        """
+        self.image_velocity = velocity
+
+    def get_tracking_stats(self):
+        """
+        Returns:
+            dict: Number of frames found in the tracking window, lost from it, and searched in full.
+        """
+        return {"roi_hits": self.roi_hits, "roi_misses": self.roi_misses, "full_searches": self.full_searches}
+
+    def publish(self, timestamp, target, frame_width):
+        """
+        Publishes the result of a processed frame for the control loop. Only the detector thread publishes,
+        and readers see either the previous result or this one, never a mix.
+
+        Args:
+            timestamp (float): time.monotonic() at which the frame was captured.
+            target (tuple): Result of find_target(), or None.
+            frame_width (int): Width of the processed frame in pixels.
+
+        Returns:
+            DetectionResult: The published result.
+        """
+        self.frame_id += 1
+        timestamp -= self.frame_delay  # Exposure midpoint, when the target was where the frame shows it
+        if target is None:
+            result = DetectionResult(self.frame_id, timestamp, time.monotonic() - timestamp)
         else:
-            self.x_displacement = None  # Reset displacement when no valid targets are detected
+            center_x, center_y, _, area, circularity = target
+            velocity = self.image_velocity
+            crossing_time = None
+            if velocity:
+                # With a rolling shutter the target's row was exposed line_time per row after the middle row
+                if self.line_time and self.frame_shape is not None:
+                    center_x -= velocity * self.line_time * (center_y - self.frame_shape[0] / 2)
+                crossing_time = timestamp - (center_x - frame_width / 2) / velocity
+            result = DetectionResult(self.frame_id, timestamp, time.monotonic() - timestamp,
+                                     int(round(center_x - (frame_width // 2))), (float(center_x), float(center_y)),
+                                     area, circularity, crossing_time)
+        self.frame_times.append(timestamp)
+        self.latencies.append(result.latency)
+        self.latest_result = result  # Single reference swap
+        self.events.dispatch(result)
+        return result
 
     def get_x_displacement(self):
-        return self.x_displacement
+        """
+        Returns:
+            int: x displacement of the latest result, None if it has no target or before the first frame.
+        """
+        result = self.latest_result
+        return None if result is None else result.x_displacement
+
+    def get_result(self):
+        """
+        Returns:
+            DetectionResult: The most recently published result, or None before the first frame.
+        """
+        return self.latest_result
+
+    def subscribe(self, event, callback):
+        """
+        Calls callback(result) on the detector thread whenever an event occurs, see DetectorEvents.
+
+        Returns:
+            int: Token for unsubscribe().
+        """
+        return self.events.subscribe(event, callback)
+
+    def unsubscribe(self, token):
+        self.events.unsubscribe(token)
+
+    def wait_for(self, event, timeout=None):
+        """
+        Blocks until the next "measurement", "acquired", "lost" or "centred" event.
+
+        Returns:
+            DetectionResult: The result that raised the event, or None on timeout.
+
+        Raises:
+            RuntimeError: If the detection thread has stopped on an error, see run().
+        """
+        return self.events.wait(event, timeout)
+
+    def get_fps(self):
+        """
+        Returns:
+            float: Sustained frame rate over the last fps_window frames.
+        """
+        frame_times = tuple(self.frame_times)  # Copied in one step while the detector thread appends
+        if len(frame_times) < 2:
+            return 0.0
+        elapsed = frame_times[-1] - frame_times[0]
+        return (len(frame_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def dump_stats(self, file=None):
+        """
+        Prints the per-stage timing percentiles. Does nothing unless the detector was created with instrument=True.
+        """
+        if self.timer is not None:
+            self.timer.dump(file)
+
+    def get_latency(self):
+        """
+        Returns:
+            dict: Mean and max capture-to-result latency in seconds over the last fps_window frames.
+        """
+        latencies = tuple(self.latencies)
+        if not latencies:
+            return {"mean": 0.0, "max": 0.0}
+        return {"mean": sum(latencies) / len(latencies), "max": max(latencies)}
 
     def release(self):
-        self.cap.release()
-        if self.debug_mode:
-            cv2.destroyAllWindows()
+        self.stop()
+        if self.cap is not None:
+            self.cap.release()
+        if self.debug_view is not None:
+            self.debug_view.stop()
@@ -1,5 +1,4 @@
 from target_detector import TargetDetector
-import threading
 
 def align(req_consec_zero_count):
     """
@@ -27,7 +26,5 @@ print("Initializing target detector.")
 target_detector = TargetDetector(camera_index=1, desired_width=1280, desired_height=720, debug_mode=True)
 
 # Start the target detector and main code threads
-detector_thread = threading.Thread(target=target_detector.detect_targets)
-detector_thread.start()
-
-detector_thread.join()
\ No newline at end of file
+target_detector.start()
+target_detector.detection_thread.join()
\ No newline at end of file
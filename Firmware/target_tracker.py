@@ -0,0 +1,151 @@
+import bisect
+import threading
+import time
+
+class TargetTracker:
+    """
+    Alpha-beta tracker that fuses camera centroids with the steps the motor has issued.
+
+    The target is stationary, so it is tracked as a position in motor steps. Each measurement is converted
+    with the motor position at the frame's capture timestamp (interpolated from the step log), which
+    removes the motion that happened while the frame was being captured and processed. The displacement
+    at any instant is then the tracked target position minus the current motor position, so the
+    controller can correct between frames instead of waiting on a stale reading.
+
+    Positive displacement means the target is ahead in the direction the motor moves with direction 1,
+    matching move_motor(1 if displacement > 0 else 0, ...) in firmware.py.
+    """
+
+    def __init__(self, steps_per_pixel, alpha=0.5, beta=0.05, history=4096, max_age=None):
+        """
+        Args:
+            steps_per_pixel (float): Motor steps that move the target one pixel across the image.
+            alpha (float): Position gain, 1 trusts each measurement fully.
+            beta (float): Drift gain, absorbs slow apparent target motion such as a scale error.
+            history (int): Step log entries kept for looking up past positions.
+            max_age (float): Seconds after the last measurement the estimate is still reported, None for always.
+        """
+        self.steps_per_pixel = steps_per_pixel
+        self.alpha = alpha
+        self.beta = beta
+        self.history = history
+        self.max_age = max_age
+        self.lock = threading.Lock()
+
+        self.position = 0  # Motor position in steps
+        self.log_times = [time.monotonic()]
+        self.log_positions = [0]
+
+        self.target = None  # Estimated target position in steps
+        self.drift = 0.0  # Estimated target drift in steps per second
+        self.estimate_time = None
+        self.last_frame_id = None
+        self.last_measurement_time = None
+
+    def record_steps(self, steps, timestamp=None):
+        """
+        Logs steps issued to the motor. Call per step or per batch as they go out.
+
+        Args:
+            steps (int): Signed steps, positive for direction 1.
+            timestamp (float): time.monotonic() when the steps were issued, now by default.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self.lock:
+            self.position += steps
+            self.log_times.append(timestamp)
+            self.log_positions.append(self.position)
+            if len(self.log_times) > 2 * self.history:
+                del self.log_times[:-self.history]
+                del self.log_positions[:-self.history]
+
+    def position_at(self, timestamp):
+        """
+        Args:
+            timestamp (float): time.monotonic() value.
+
+        Returns:
+            float: Motor position in steps at that time, linearly interpolated between log entries.
+        """
+        with self.lock:
+            return self._position_at(timestamp)
+
+    def _position_at(self, timestamp):
+        index = bisect.bisect_right(self.log_times, timestamp)
+        if index == 0:
+            return self.log_positions[0]
+        if index == len(self.log_times):
+            return self.position
+        t0, t1 = self.log_times[index - 1], self.log_times[index]
+        p0, p1 = self.log_positions[index - 1], self.log_positions[index]
+        # Steps are logged as they are issued, so between entries the motor moves toward the next one
+        fraction = (timestamp - t0) / (t1 - t0) if t1 > t0 else 1.0
+        return p0 + (p1 - p0) * fraction
+
+    def update(self, result):
+        """
+        Folds in a detection result. Results already seen and frames without a target are ignored.
+
+        Args:
+            result (DetectionResult): Result from TargetDetector.get_result(), or None.
+
+        Returns:
+            bool: True if the estimate was updated.
+        """
+        if result is None or result.x_displacement is None or result.frame_id == self.last_frame_id:
+            return False
+
+        with self.lock:
+            self.last_frame_id = result.frame_id
+            measured = self._position_at(result.timestamp) + result.x_displacement * self.steps_per_pixel
+
+            if self.target is None:
+                self.target = measured
+                self.drift = 0.0
+            else:
+                dt = max(result.timestamp - self.estimate_time, 1e-6)
+                predicted = self.target + self.drift * dt
+                residual = measured - predicted
+                self.target = predicted + self.alpha * residual
+                self.drift += self.beta * residual / dt
+            self.estimate_time = result.timestamp
+            self.last_measurement_time = result.timestamp
+        return True
+
+    def steps_to_target(self, timestamp=None):
+        """
+        Args:
+            timestamp (float): time.monotonic() to estimate at, now by default.
+
+        Returns:
+            float: Signed steps from the current motor position to the target, or None without a valid estimate.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self.lock:
+            if self.target is None:
+                return None
+            if self.max_age is not None and timestamp - self.last_measurement_time > self.max_age:
+                return None
+            target = self.target + self.drift * (timestamp - self.estimate_time)
+            return target - self._position_at(timestamp)
+
+    def displacement(self, timestamp=None):
+        """
+        Args:
+            timestamp (float): time.monotonic() to estimate at, now by default.
+
+        Returns:
+            float: Estimated x displacement of the target in pixels, or None without a valid estimate.
+        """
+        steps = self.steps_to_target(timestamp)
+        return None if steps is None else steps / self.steps_per_pixel
+
+    def reset(self):
+        """
+        Forgets the target, e.g. when moving on to the next one. The step log is kept.
+        """
+        with self.lock:
+            self.target = None
+            self.drift = 0.0
+            self.estimate_time = None
+            self.last_measurement_time = None
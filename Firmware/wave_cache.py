@@ -0,0 +1,149 @@
+from collections import OrderedDict
+
+MAX_WAVES = 250  # Wave ids the pigpio daemon can hand out
+CBS_PER_PULSE = 2  # Approximate DMA control blocks wave_create uses per pulse
+
+class WaveCache:
+    """
+    Keeps pigpio waves between moves, so a ramp that has been played before reuses its wave id instead of
+    being added and created again pulse by pulse.
+
+    Waves are keyed by whatever identifies their contents, e.g. ("step", pin, period) for a one-step wave.
+    The cache owns every wave on the connection and mirrors how the daemon allocates them: memory is taken
+    from the top, and a deleted wave's memory is only reused by a wave of exactly the same size or once
+    every wave above it is deleted too. Before creating a wave, the least recently used waves are deleted
+    until it fits within headroom of the daemon's wave id, pulse and control block limits. Should
+    wave_create() still fail, e.g. because control blocks are only estimated, the waves with the highest ids
+    are deleted until it succeeds. Waves in the chain being played are never deleted.
+    """
+
+    def __init__(self, pi, headroom=0.9):
+        """
+        Args:
+            pi: Connected pigpio.pi, or a SimulatedPi. Any waves already on it are cleared.
+            headroom (float): Fraction of each daemon limit the cache fills before evicting.
+        """
+        self.pi = pi
+        self.headroom = headroom
+        self.max_pulses = pi.wave_get_max_pulses()
+        self.max_cbs = pi.wave_get_max_cbs()
+        pi.wave_clear()
+        self.entries = OrderedDict()  # Key to (wave id, pulses), least recently used first
+        self.sizes = []  # Pulses of every wave id the daemon has allocated, live or deleted
+        self.deleted = []  # Whether each allocated wave id has been deleted
+        self.playing = set()  # Wave ids of the chain being played
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.create_failures = 0
+
+    def get(self, key, pulses, keep=()):
+        """
+        Returns the wave for a key, creating it on a miss.
+
+        Args:
+            key: Hashable description of the wave's contents.
+            pulses (callable): Returns the wave's pulses, only called on a miss.
+            keep (collection): Wave ids that must not be evicted to make room, e.g. those already chosen for
+                the chain being built.
+
+        Returns:
+            int: Wave id.
+
+        Raises:
+            RuntimeError: If the wave does not fit even with every other wave evicted.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        pulses = pulses()
+        while not self.fits(len(pulses), self.headroom) and self.evict(keep):
+            pass
+        self.pi.wave_add_generic(pulses)
+        while True:
+            try:
+                wave_id = self.pi.wave_create()
+                break
+            except Exception as error:  # pigpio.error, or the simulator's equivalent
+                self.create_failures += 1
+                if not self.evict(keep, top=True):
+                    self.pi.wave_add_new()  # Drop the pending pulses, they would be added to the next wave
+                    raise RuntimeError("pigpio wave memory is full of waves that are playing or kept") from error
+
+        self.entries[key] = (wave_id, len(pulses))
+        if wave_id < len(self.sizes):
+            self.deleted[wave_id] = False  # Reused an exactly sized hole
+        else:
+            self.sizes.append(len(pulses))
+            self.deleted.append(False)
+        return wave_id
+
+    def fits(self, pulses, fraction=1.0):
+        """
+        Returns:
+            bool: Whether a wave of this many pulses can be created without exceeding the fraction of the
+            daemon's limits.
+        """
+        if any(deleted and size == pulses for size, deleted in zip(self.sizes, self.deleted)):
+            return True
+        top = sum(self.sizes) + pulses
+        return (len(self.sizes) + 1 <= fraction * MAX_WAVES and top <= fraction * self.max_pulses
+                and CBS_PER_PULSE * top <= fraction * self.max_cbs)
+
+    def evict(self, keep=(), top=False):
+        """
+        Deletes the least recently used wave that is not playing or kept.
+
+        Args:
+            keep (collection): Wave ids that must not be deleted.
+            top (bool): Delete the wave with the highest id instead, which frees memory straight away.
+
+        Returns:
+            bool: Whether a wave was deleted.
+        """
+        candidates = [key for key, (wave_id, _) in self.entries.items()
+                      if wave_id not in self.playing and wave_id not in keep]
+        if not candidates:
+            return False
+        key = max(candidates, key=lambda k: self.entries[k][0]) if top else candidates[0]
+        wave_id, _ = self.entries.pop(key)
+        self.pi.wave_delete(wave_id)
+        self.deleted[wave_id] = True
+        while self.deleted and self.deleted[-1]:  # The daemon frees the memory of deleted waves at the top
+            self.deleted.pop()
+            self.sizes.pop()
+        self.evictions += 1
+        return True
+
+    def set_playing(self, wave_ids):
+        """
+        Protects the waves of the chain about to be played, releasing those of the previous chain.
+        """
+        self.playing = set(wave_ids)
+
+    def clear(self):
+        """
+        Deletes every cached wave that is not playing.
+        """
+        while self.evict():
+            pass
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Hits, misses, evictions and create failures, the waves and pulses held, and the pulses and
+            estimated control blocks allocated, including holes left by deleted waves, against the daemon's
+            limits.
+        """
+        lookups = self.hits + self.misses
+        allocated = sum(self.sizes)
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "create_failures": self.create_failures,
+                "waves": len(self.entries), "max_waves": MAX_WAVES,
+                "pulses": sum(pulses for _, pulses in self.entries.values()),
+                "allocated_pulses": allocated, "max_pulses": self.max_pulses,
+                "cbs": CBS_PER_PULSE * allocated, "max_cbs": self.max_cbs}